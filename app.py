@@ -1,17 +1,49 @@
+import time
+
+# Taken before the other imports so startup timings include them.
+BOOT_STARTED = time.perf_counter()
+
 import asyncio
-import threading
+import functools
+import importlib
 import json
 import os
+import sqlite3
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-import pandas as pd
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from scraper import scrape_google_maps
+from batches import BatchRunner, parse_matrix
+from browser_pool import BrowserPool
+from checkpoints import CheckpointStore
+from domain_cache import DomainCache
+from exports import XlsxExporter, iter_csv, iter_ndjson
+from hub import ALL_JOBS, PubSubHub
+from protocol import enrich_message, parse_protocol
+from query_cache import QueryCache, make_key
+from jobs import CANCELLED, FAILED, JOB_ID_PATTERN, Job, JobScheduler
+from lead_store import LeadStore
+from metrics import JobMetrics, MetricsRegistry
+from normalize import dedupe, normalize_leads, parse_weights, to_records
+from pacing import HostBuckets, PacingController
+from profiling import ProfileSession, ProfileStore
+from resource_policy import PRESETS
+from sharding import plan_shards, run_sharded
+from static_cache import CachedFile
+from suggestions import SuggestionEngine
+
+# scraper (Playwright, stealth, httpx) and openpyxl are imported on first
+# use, so the server answers /health and / before they are loaded.
+startup_timings: Dict[str, Optional[float]] = {
+    "imports_ms": round((time.perf_counter() - BOOT_STARTED) * 1000, 1),
+    "ready_ms": None,
+    "pool_warm_ms": None,
+}
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -29,43 +61,223 @@ try:
 except OSError:
     RESULTS_DIR = os.path.join("/tmp", "results")
     os.makedirs(RESULTS_DIR, exist_ok=True)
-LATEST_JSON = os.path.join(RESULTS_DIR, "latest_results.json")
-LATEST_XLSX = os.path.join(RESULTS_DIR, "latest_results.xlsx")
-LATEST_CSV = os.path.join(RESULTS_DIR, "latest_results.csv")
+JOB_RESULTS_DIR = os.path.join(RESULTS_DIR, "jobs")
+os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get("QUERY_CACHE_TTL_SECONDS", str(6 * 3600)))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+query_cache = QueryCache(os.path.join(RESULTS_DIR, "cache"), QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_MAX_BYTES)
+lead_store = LeadStore(os.path.join(RESULTS_DIR, "leads.db"))
+xlsx_exporter = XlsxExporter(JOB_RESULTS_DIR)
+checkpoint_store = CheckpointStore(os.path.join(RESULTS_DIR, "checkpoints"))
+PROFILE_MAX_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", str(200 * 1024 * 1024)))
+PROFILE_TTL_SECONDS = float(os.environ.get("PROFILE_TTL_SECONDS", str(3 * 24 * 3600)))
+profile_store = ProfileStore(os.path.join(RESULTS_DIR, "profiles"), PROFILE_MAX_BYTES, PROFILE_TTL_SECONDS)
+# Jobs interrupted by a restart (not ones a user stopped) continue on startup.
+RESUME_ON_STARTUP = os.environ.get("RESUME_ON_STARTUP", "true").lower() != "false"
+CHECKPOINT_JOB_FIELDS = (
+    "keyword", "location", "deep_search", "max_parallel_tabs", "resource_policy", "priority", "max_results",
+)
+ENRICH_CACHE_TTL_SECONDS = float(os.environ.get("ENRICH_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ENRICH_CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get("ENRICH_CACHE_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+ENRICH_CACHE_MAX_ENTRIES = int(os.environ.get("ENRICH_CACHE_MAX_ENTRIES", "50000"))
+domain_cache = DomainCache(
+    os.path.join(RESULTS_DIR, "enrichment.db"),
+    ENRICH_CACHE_TTL_SECONDS,
+    ENRICH_CACHE_NEGATIVE_TTL_SECONDS,
+    ENRICH_CACHE_MAX_ENTRIES,
+)
+
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "1"))
+BROWSER_POOL_MAX_USES = int(os.environ.get("BROWSER_POOL_MAX_USES", "20"))
+# Workers beyond the pool size just wait on a browser checkout.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", str(BROWSER_POOL_SIZE)))
+# Sharded jobs launch their own browsers, one per worker process.
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "2"))
+MAX_RESULTS_LIMIT = int(os.environ.get("MAX_RESULTS_LIMIT", "2000"))
+
+# One pace for every job in this process: they all share the server's IP.
+PACE_MIN_SECONDS = float(os.environ.get("PACE_MIN_SECONDS", "0.2"))
+PACE_MAX_SECONDS = float(os.environ.get("PACE_MAX_SECONDS", "60"))
+ENRICH_HOST_RATE = float(os.environ.get("ENRICH_HOST_RATE", "2"))
+pacer = PacingController(
+    min_delay=PACE_MIN_SECONDS,
+    max_delay=PACE_MAX_SECONDS,
+    hosts=HostBuckets(rate=ENRICH_HOST_RATE),
+)
+
+# Post-processing for GET /jobs/{id}/normalized: national phone numbers are
+# read as PHONE_COUNTRY_CODE, and LEAD_SCORE_WEIGHTS ("rating=0.4,email=0.3")
+# overrides the default score weights.
+PHONE_COUNTRY_CODE = os.environ.get("PHONE_COUNTRY_CODE", "1").lstrip("+")
+LEAD_SCORE_WEIGHTS = parse_weights(os.environ.get("LEAD_SCORE_WEIGHTS"))
+
+# With prewarming off, each browser launches on its first checkout.
+PREWARM_BROWSERS = os.environ.get("PREWARM_BROWSERS", "true").lower() != "false"
+
+browser_pool = BrowserPool(size=BROWSER_POOL_SIZE, max_uses=BROWSER_POOL_MAX_USES)
+metrics_registry = MetricsRegistry()
+index_page = CachedFile(os.path.join(BASE_DIR, "index.html"), "text/html; charset=utf-8")
+
+
+async def _load_scraper():
+    """Import ``scraper`` on a worker thread; instant once it is loaded."""
+    return await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, "scraper")
+
+
+async def _prewarm() -> None:
+    """Import the scraper and launch the pool's browsers without blocking readiness."""
+    started = time.perf_counter()
+    await _load_scraper()
+    await browser_pool.prewarm()
+    startup_timings["pool_warm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    warm = browser_pool.stats()["warm"]
+    print(f"Browser pool warm-up finished in {startup_timings['pool_warm_ms']:.0f} ms ({warm}/{browser_pool.size} warm)")
+
+
+async def _load_suggestion_history() -> None:
+    started = time.perf_counter()
+    try:
+        rows = await asyncio.get_running_loop().run_in_executor(None, lead_store.query_history)
+    except sqlite3.Error as exc:
+        print(f"Suggestion history not loaded: {exc}")
+        return
+    suggestion_engine.load_history(rows)
+    print(f"Loaded {len(rows)} past searches into suggestions in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await browser_pool.start()
+    await scheduler.start()
+    prewarm = asyncio.create_task(_prewarm()) if PREWARM_BROWSERS else None
+    history = asyncio.create_task(_load_suggestion_history())
+    if RESUME_ON_STARTUP:
+        for checkpoint in checkpoint_store.list():
+            if not checkpoint.get("auto_resume") or not _resume_job(checkpoint.get("job_id")):
+                continue
+            if checkpoint.get("queued"):
+                print(f"Requeuing job {checkpoint['job_id']}, which had not started before the restart")
+            else:
+                print(f"Resuming interrupted job {checkpoint['job_id']} from listing {checkpoint.get('index', 0)}")
+    startup_timings["ready_ms"] = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    print(f"Ready in {startup_timings['ready_ms']:.0f} ms (imports {startup_timings['imports_ms']:.0f} ms)")
+    try:
+        yield
+    finally:
+        if prewarm is not None:
+            prewarm.cancel()
+            await asyncio.gather(prewarm, return_exceptions=True)
+        history.cancel()
+        await asyncio.gather(history, return_exceptions=True)
+        await batch_runner.stop()
+        await scheduler.stop()
+        await browser_pool.stop()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/health")
 async def health() -> JSONResponse:
-    return JSONResponse({"status": "ok"})
+    return JSONResponse({"status": "ok", "startup": startup_timings, "pool_warm": browser_pool.stats()["warm"]})
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> PlainTextResponse:
+    pool = browser_pool.stats()
+    gauges = {
+        "pool_in_use": pool["in_use"],
+        "pool_available": pool["available"],
+        "ws_subscribers": len(hub.subscribers),
+        "jobs_queued": sum(1 for job in scheduler.jobs.values() if job.status == "queued"),
+        "jobs_running": sum(1 for job in scheduler.jobs.values() if job.status == "running"),
+        "pace_delay_seconds": pacer.delay,
+    }
+    for name, value in startup_timings.items():
+        if value is not None:
+            gauges[f"startup_{name[: -len('_ms')]}_seconds"] = value / 1000
+    return PlainTextResponse(metrics_registry.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/pool")
+async def pool_stats() -> JSONResponse:
+    return JSONResponse(browser_pool.stats())
+
+
+@app.get("/pacing")
+async def pacing_stats() -> JSONResponse:
+    return JSONResponse(pacer.stats())
+
+
+@app.get("/suggest")
+async def suggest(q: str = "", field: str = "keyword", limit: int = 6) -> JSONResponse:
+    if field not in SuggestionEngine.FIELDS:
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(SuggestionEngine.FIELDS)}")
+    return JSONResponse({"field": field, "query": q, "suggestions": suggestion_engine.suggest(field, q, limit)})
+
+
+@app.get("/suggest/stats")
+async def suggest_stats() -> JSONResponse:
+    return JSONResponse(suggestion_engine.stats())
+
+
+@app.get("/hub")
+async def hub_stats() -> JSONResponse:
+    return JSONResponse(hub.stats())
+
+
+@app.get("/cache")
+async def cache_stats() -> JSONResponse:
+    body = query_cache.stats()
+    body["enrichment"] = domain_cache.stats()
+    return JSONResponse(body)
+
+
+MAX_PARALLEL_TABS_LIMIT = int(os.environ.get("MAX_PARALLEL_TABS_LIMIT", "8"))
+RESOURCE_POLICY = os.environ.get("RESOURCE_POLICY", "lean")
 
 
 class ScrapeRequest(BaseModel):
     keyword: str
     location: str
+    max_parallel_tabs: int = 1
+    resource_policy: Optional[str] = None
+    profile: bool = False
+
+
+class JobRequest(ScrapeRequest):
+    deep_search: bool = False
+    priority: int = 0
+    force_refresh: bool = False
+    max_results: int = 100
+    areas: Optional[List[str]] = None
+    grid: Optional[Dict[str, Any]] = None
+
+
+def _parse_parallel_tabs(value: Any) -> int:
+    try:
+        tabs = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(tabs, MAX_PARALLEL_TABS_LIMIT))
 
 
-class ConnectionManager:
-    def __init__(self) -> None:
-        self.active: Optional[WebSocket] = None
+def _parse_resource_policy(value: Any) -> str:
+    return value if value in PRESETS else RESOURCE_POLICY
 
-    async def connect(self, websocket: WebSocket) -> None:
-        await websocket.accept()
-        self.active = websocket
 
-    def disconnect(self, websocket: WebSocket) -> None:
-        if self.active == websocket:
-            self.active = None
+def _parse_max_results(value: Any) -> int:
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return 100
+    return max(1, min(limit, MAX_RESULTS_LIMIT))
 
-    async def send(self, message: str) -> None:
-        if self.active:
-            await self.active.send_text(message)
 
+WS_SEND_QUEUE = int(os.environ.get("WS_SEND_QUEUE", "256"))
 
-manager = ConnectionManager()
-current_task: Optional[asyncio.Task] = None
-current_stop_event: Optional[threading.Event] = None
+hub = PubSubHub(max_queue=WS_SEND_QUEUE)
 
 SUGGESTIONS = [
     "Real Estate",
@@ -120,141 +332,640 @@ SUGGESTIONS = [
     "Cleaning Services",
 ]
 
+# Seeded with SUGGESTIONS; ranked by the lead store's history and by jobs as they finish.
+suggestion_engine = SuggestionEngine(SUGGESTIONS)
+
 
 @app.get("/")
-async def index() -> HTMLResponse:
-    with open(os.path.join(BASE_DIR, "index.html"), "r", encoding="utf-8") as handle:
-        return HTMLResponse(handle.read())
+async def index(request: Request) -> Response:
+    return index_page.response(request)
 
 
-async def run_scrape(keyword: str, location: str, deep_search: bool) -> None:
-    loop = asyncio.get_event_loop()
-    queue: asyncio.Queue[str] = asyncio.Queue()
-    stop_event = threading.Event()
-    global current_stop_event
-    current_stop_event = stop_event
+def _replay_cached(job: Job, leads: List[Dict[str, Any]]) -> None:
+    """Emit cached leads exactly as a live scrape would."""
+    for lead in leads:
+        hub.publish(job.id, f"Captured: {lead['Name']}")
+        hub.publish(job.id, f"__LEAD__:{json.dumps(lead, ensure_ascii=False)}")
+        if job.deep_search:
+            hub.publish(job.id, enrich_message(lead))
 
-    async def forward_logs() -> None:
-        while True:
-            message = await queue.get()
-            await manager.send(message)
-            if message == "__SCRAPE_DONE__":
-                break
+
+def _finish_stream(job: Job, job_metrics: JobMetrics) -> None:
+    """Send the job's timing summary, then the done marker."""
+    job.metrics = job_metrics.summary()
+    hub.publish(job.id, "__METRICS__:" + json.dumps(job.metrics, ensure_ascii=False))
+    hub.publish(job.id, "__SCRAPE_DONE__")
+
+
+def _checkpoint_params(job: Job) -> Dict[str, Any]:
+    return {name: getattr(job, name) for name in CHECKPOINT_JOB_FIELDS}
+
+
+async def run_scrape(job: Job) -> List[Dict[str, Any]]:
+    loop = asyncio.get_event_loop()
+    job_metrics = JobMetrics(metrics_registry)
+    if job.started_at is not None:
+        job_metrics.observe("queue_wait", max(0.0, job.started_at - job.created_at))
+    sharded = bool(job.areas or job.grid)
+    cache_key = make_key(job.keyword, job.location, job.deep_search, job.max_results)
+    resume_state = await loop.run_in_executor(None, checkpoint_store.load, job.id) if job.resumed else None
+    if resume_state is not None and resume_state.get("queued"):
+        # Interrupted before it started: nothing to restore, so run it as new.
+        resume_state = None
+    # The cache key doesn't describe shards, so sharded runs always scrape;
+    # neither do profiled runs, which exist to capture a real scrape.
+    if not job.force_refresh and not sharded and not job.profile and resume_state is None:
+        with job_metrics.span("cache_lookup"):
+            cached = await loop.run_in_executor(None, query_cache.get, cache_key)
+        if cached is not None:
+            job.cached = True
+            with job_metrics.span("lead_store"):
+                await loop.run_in_executor(None, lead_store.upsert_many, cached, job.id, job.keyword, job.location)
+            hub.publish(job.id, f"Starting scraper (job {job.id})...")
+            _replay_cached(job, cached)
+            job_metrics.count("leads", len(cached))
+            await loop.run_in_executor(None, checkpoint_store.delete, job.id)
+            _finish_stream(job, job_metrics)
+            hub.publish(job.id, "Scrape finished. Results ready.")
+            return cached
 
     def log_callback(message: str) -> None:
-        loop.call_soon_threadsafe(queue.put_nowait, message)
+        # Publishing only enqueues per subscriber, so a slow client never
+        # holds up the scraper thread.
+        loop.call_soon_threadsafe(hub.publish, job.id, message)
+
+    def lead_callback(lead: Dict[str, Any]) -> None:
+        # Runs on the scraper (or enricher) thread; LeadStore keeps a connection per thread.
+        try:
+            lead_store.upsert(lead, job.id, job.keyword, job.location)
+        except sqlite3.Error as exc:
+            print(f"Lead store write failed for job {job.id}: {exc}")
+
+    enrich_cache = domain_cache.session() if job.deep_search else None
+    checkpoint_params = _checkpoint_params(job)
+
+    def checkpoint_callback(state: Dict[str, Any]) -> None:
+        state.update(job=checkpoint_params, auto_resume=not job.user_cancelled)
+        try:
+            checkpoint_store.save(job.id, state)
+        except OSError as exc:
+            print(f"Checkpoint write failed for job {job.id}: {exc}")
 
     async def run_playwright() -> List[Dict[str, Any]]:
-        print("SCRAPER STARTED")
-        await manager.send("Starting scraper...")
+        print(f"SCRAPER STARTED job={job.id}")
+        hub.publish(job.id, f"Starting scraper (job {job.id})...")
+        if resume_state is not None:
+            hub.publish(
+                job.id,
+                f"Resuming from listing {resume_state.get('index', 0)} "
+                f"({len(resume_state.get('leads', []))} leads restored)...",
+            )
+            _replay_cached(job, resume_state.get("leads", []))
+        else:
+            await loop.run_in_executor(
+                None, checkpoint_callback, {"leads": [], "seen": [], "index": 0}
+            )
+        scraper = await _load_scraper()
+        checkout_started = time.perf_counter()
+        async with browser_pool.checkout() as slot:
+            job_metrics.observe("pool_checkout", time.perf_counter() - checkout_started)
+            # With profiling on, the scrape runs inside ProfileSession.profile_call on the slot thread.
+            around = functools.partial(profiler.profile_call, slot.context) if profiler else None
+            leads = list(resume_state.get("leads", [])) if resume_state else []
+            events = scraper.aiter_scrape_google_maps(
+                job.keyword,
+                job.location,
+                log_callback,
+                job.max_results,
+                False,
+                job.stop_event,
+                job.deep_search,
+                context=slot.context,
+                max_parallel_tabs=job.max_parallel_tabs,
+                resource_policy=job.resource_policy,
+                lead_callback=lead_callback,
+                enrich_cache=enrich_cache,
+                resume_state=resume_state,
+                checkpoint_callback=checkpoint_callback,
+                metrics=job_metrics,
+                pacer=pacer,
+                executor=slot.executor,
+                around=around,
+            )
+            async with aclosing(events):
+                async for kind, lead in events:
+                    if kind == scraper.LEAD:
+                        leads.append(lead)
+                    hub.publish(job.id, scraper.event_message(kind, lead))
+            return leads
+
+    async def run_shards() -> List[Dict[str, Any]]:
+        print(f"SHARDED SCRAPER STARTED job={job.id}")
+        hub.publish(job.id, f"Starting sharded scraper (job {job.id})...")
+        shards = plan_shards(job.location, job.areas, job.grid)
         return await loop.run_in_executor(
             None,
-            scrape_google_maps,
-            keyword,
-            location,
-            log_callback,
-            100,
-            False,
-            stop_event,
-            deep_search,
+            lambda: run_sharded(
+                job.keyword,
+                shards,
+                log_callback,
+                job.max_results,
+                job.stop_event,
+                deep_search=job.deep_search,
+                resource_policy=job.resource_policy,
+                workers=SHARD_WORKERS,
+                lead_callback=lead_callback,
+            ),
         )
 
-    forward_task = asyncio.create_task(forward_logs())
-    leads = await run_playwright()
-    loop.call_soon_threadsafe(queue.put_nowait, "__SCRAPE_DONE__")
-    await forward_task
+    profiler = None
+    if job.profile and sharded:
+        hub.publish(job.id, "Profiling is not available for sharded jobs; running without it.")
+    elif job.profile:
+        profiler = ProfileSession(profile_store, job.id, job.to_dict())
+        profiler.monitor.start()
+        hub.publish(job.id, "Profiling enabled: recording a Playwright trace, cProfile and event-loop stalls.")
+
+    try:
+        with job_metrics.span("scrape"):
+            leads = await (run_shards() if sharded else run_playwright())
+        if sharded:
+            job_metrics.count("leads", len(leads))
+    except Exception as exc:
+        hub.publish(job.id, f"Scrape failed: {exc}")
+        # Keep the checkpoint for a manual resume, but don't retry a failing job on every startup.
+        await loop.run_in_executor(None, lambda: checkpoint_store.update(job.id, auto_resume=False))
+        raise
+    finally:
+        if enrich_cache is not None:
+            job.enrichment_cache = enrich_cache.stats()
+        if profiler is not None:
+            await profiler.monitor.stop()
+            try:
+                await loop.run_in_executor(None, profiler.finish)
+                job.profile_url = f"/profiles/{job.id}"
+                hub.publish(job.id, f"Profile saved: {job.profile_url}")
+            except OSError as exc:
+                hub.publish(job.id, f"Profile could not be saved: {exc}")
+        _finish_stream(job, job_metrics)
+
+    if not job.stop_event.is_set() and not sharded:
+        # An empty or throttled run says nothing reliable about the query;
+        # caching it would serve that answer until the TTL runs out.
+        if leads and not job_metrics.counters.get("degraded"):
+            with job_metrics.span("cache_write"):
+                await loop.run_in_executor(None, query_cache.put, cache_key, leads)
+        await loop.run_in_executor(None, checkpoint_store.delete, job.id)
+    hub.publish(job.id, "Scrape finished. Results ready.")
+    return leads
+
+
+def _record_run(job: Job) -> None:
+    try:
+        lead_store.record_run(job.id, job.keyword, job.location, job.lead_count)
+    except sqlite3.Error as exc:
+        print(f"Run history write failed for job {job.id}: {exc}")
+
+
+def _on_job_finish(job: Job) -> None:
+    metrics_registry.record_job(job.status)
+    if job.status != FAILED:
+        suggestion_engine.record_job(job.keyword, job.location, job.lead_count)
+        # The same counts, persisted so suggestions rank the same after a restart.
+        asyncio.get_running_loop().run_in_executor(None, _record_run, job)
+
+
+scheduler = JobScheduler(run_scrape, workers=JOB_WORKERS, on_finish=_on_job_finish)
+
+
+def _resume_job(job_id: str) -> Optional[Job]:
+    """Queue a checkpointed job again under its own id.
+
+    Returns None for ids the scheduler could not have issued and for
+    missing or malformed checkpoints.
+    """
+    if not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    current = scheduler.get(job_id)
+    if current is not None and not current.finished:
+        return current
+    checkpoint = checkpoint_store.load(job_id)
+    if not isinstance(checkpoint, dict) or not isinstance(checkpoint.get("job"), dict):
+        return None
+    try:
+        job = Job(id=job_id, resumed=True, **checkpoint["job"])
+    except (TypeError, ValueError):
+        return None
+    return scheduler.submit(job)
+
+
+def _submit_job(job: Job) -> Job:
+    """Queue ``job``, checkpointing it first so a restart doesn't lose it while it waits.
+
+    The checkpoint is marked ``queued`` and holds only the job parameters;
+    the first checkpoint of the run replaces it. Sharded jobs are never
+    checkpointed.
+    """
+    if not (job.areas or job.grid):
+        try:
+            checkpoint_store.save(job.id, {"job": _checkpoint_params(job), "auto_resume": True, "queued": True})
+        except OSError as exc:
+            print(f"Checkpoint write failed for job {job.id}: {exc}")
+    return scheduler.submit(job)
+
+
+def _cancel_job(job_id: str) -> Optional[Job]:
+    job = scheduler.cancel(job_id)
+    if job is not None and job.status == CANCELLED and job.started_at is None:
+        # Cancelled while queued: the run that would replace its checkpoint never comes.
+        checkpoint_store.delete(job.id)
+    return job
+
+
+def _build_job(request: JobRequest) -> Job:
+    """Raises ``ValueError`` when ``areas``/``grid`` can't be split into shards."""
+    job = Job(
+        keyword=request.keyword.strip(),
+        location=request.location.strip(),
+        deep_search=request.deep_search,
+        max_parallel_tabs=_parse_parallel_tabs(request.max_parallel_tabs),
+        resource_policy=_parse_resource_policy(request.resource_policy),
+        priority=request.priority,
+        max_results=_parse_max_results(request.max_results),
+        force_refresh=request.force_refresh,
+        profile=request.profile,
+        areas=request.areas or None,
+        grid=request.grid or None,
+    )
+    if job.areas or job.grid:
+        plan_shards(job.location, job.areas, job.grid)
+    return job
+
+
+# Sub-jobs of bulk batches; interactive jobs (priority 0) go ahead of them.
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", str(JOB_WORKERS)))
+BULK_PRIORITY = int(os.environ.get("BULK_PRIORITY", "-1"))
+BULK_JOB_OPTIONS = ("deep_search", "max_results", "max_parallel_tabs", "resource_policy", "priority", "force_refresh")
+
+
+def _build_batch_job(keyword: str, location: str, options: Dict[str, Any]) -> Job:
+    """Raises ``ValueError`` for options JobRequest rejects."""
+    fields = {key: options[key] for key in BULK_JOB_OPTIONS if options.get(key) is not None}
+    fields.setdefault("priority", BULK_PRIORITY)
+    return _build_job(JobRequest(keyword=keyword, location=location, **fields))
 
-    _save_results(leads)
-    await manager.send("Scrape finished. Results ready.")
-    current_stop_event = None
+
+batch_runner = BatchRunner(scheduler, hub, _build_batch_job, concurrency=BULK_CONCURRENCY)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
-    await manager.connect(websocket)
+    # Clients opt into the batched protocol with /ws?protocol=2 or a hello
+    # message; anything else keeps the original one-string-per-message stream.
+    await hub.connect(websocket, parse_protocol(websocket.query_params.get("protocol")))
+    last_job_id: Optional[str] = None
     try:
         while True:
             raw = await websocket.receive_text()
             try:
                 payload = json.loads(raw)
             except json.JSONDecodeError:
-                await manager.send("Invalid message format.")
+                hub.send(websocket, "Invalid message format.")
                 continue
 
+            if payload.get("type") == "hello":
+                hub.set_protocol(websocket, parse_protocol(payload.get("protocol")))
+
             if payload.get("type") == "SUGGEST":
-                query = payload.get("query", "").strip().lower()
-                matches = [
-                    item
-                    for item in SUGGESTIONS
-                    if query and query in item.lower()
-                ][:6]
-                if not query:
-                    matches = SUGGESTIONS[:6]
-                await manager.send("__SUGGEST__:" + json.dumps(matches))
+                # Keyword suggestions keep the original prefix; location ones get their own.
+                field = "location" if payload.get("field") == "location" else "keyword"
+                matches = suggestion_engine.suggest(field, str(payload.get("query") or ""))
+                prefix = "__SUGGEST_LOCATION__:" if field == "location" else "__SUGGEST__:"
+                hub.send(websocket, prefix + json.dumps(matches))
 
             if payload.get("type") == "PING":
-                await manager.send("__PONG__")
+                hub.send(websocket, "__PONG__")
 
             if payload.get("type") == "start":
                 keyword = payload.get("keyword", "").strip()
                 location = payload.get("location", "").strip()
-                deep_search = bool(payload.get("deep_search", False))
                 if not keyword or not location:
-                    await manager.send("Keyword and location are required.")
+                    hub.send(websocket, "Keyword and location are required.")
+                    continue
+                try:
+                    job = _build_job(
+                        JobRequest(
+                            keyword=keyword,
+                            location=location,
+                            deep_search=bool(payload.get("deep_search", False)),
+                            max_parallel_tabs=_parse_parallel_tabs(payload.get("max_parallel_tabs")),
+                            resource_policy=payload.get("resource_policy"),
+                            force_refresh=bool(payload.get("force_refresh", False)),
+                            profile=bool(payload.get("profile", False)),
+                            max_results=_parse_max_results(payload.get("max_results", 100)),
+                            areas=payload.get("areas"),
+                            grid=payload.get("grid"),
+                        )
+                    )
+                except ValueError as exc:
+                    hub.send(websocket, f"Invalid job: {exc}")
                     continue
-                global current_task
-                if current_task and not current_task.done():
-                    await manager.send("A scrape is already running.")
+                job = _submit_job(job)
+                last_job_id = job.id
+                hub.subscribe(websocket, job.id)
+                position = scheduler.queue_position(job)
+                hub.send(websocket, f"Job {job.id} queued (position {position}).")
+
+            if payload.get("type") in ("subscribe", "unsubscribe"):
+                job_ids = payload.get("job_ids") or [payload.get("job_id") or ALL_JOBS]
+                for job_id in job_ids:
+                    if payload["type"] == "subscribe":
+                        hub.subscribe(websocket, str(job_id))
+                    else:
+                        hub.unsubscribe(websocket, str(job_id))
+
+            if payload.get("type") == "resume":
+                job_id = payload.get("job_id") or last_job_id or ""
+                job = _resume_job(job_id)
+                if job is None:
+                    hub.send(websocket, f"No checkpoint to resume for job {job_id}.")
                     continue
-                current_task = asyncio.create_task(run_scrape(keyword, location, deep_search))
+                last_job_id = job.id
+                hub.subscribe(websocket, job.id)
+                position = scheduler.queue_position(job)
+                hub.send(websocket, f"Job {job.id} queued to resume (position {position}).")
 
             if payload.get("type") == "stop":
-                if current_stop_event:
-                    current_stop_event.set()
-                    await manager.send("Stopping scraper...")
+                job = scheduler.get(payload.get("job_id") or last_job_id or "")
+                if job and not job.finished:
+                    _cancel_job(job.id)
+                    hub.publish(job.id, f"Stopping job {job.id}...")
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
+    finally:
+        hub.disconnect(websocket)
 
 
-def _save_results(leads: List[Dict[str, Any]]) -> None:
-    with open(LATEST_JSON, "w", encoding="utf-8") as handle:
-        json.dump(leads, handle, ensure_ascii=False, indent=2)
+@app.post("/scrape")
+async def scrape(request: ScrapeRequest) -> JSONResponse:
+    job = _submit_job(
+        _build_job(
+            JobRequest(
+                keyword=request.keyword,
+                location=request.location,
+                max_parallel_tabs=request.max_parallel_tabs,
+                resource_policy=request.resource_policy,
+                profile=request.profile,
+            )
+        )
+    )
+    return JSONResponse({"status": "started", "job_id": job.id})
 
-    df = pd.DataFrame(leads)
-    df.to_excel(LATEST_XLSX, index=False)
-    df.to_csv(LATEST_CSV, index=False)
 
+@app.post("/jobs")
+async def submit_job(request: JobRequest) -> JSONResponse:
+    if not request.keyword.strip() or not request.location.strip():
+        return JSONResponse({"error": "Keyword and location are required."}, status_code=400)
+    try:
+        job = _submit_job(_build_job(request))
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    body = job.to_dict()
+    body["queue_position"] = scheduler.queue_position(job)
+    return JSONResponse(body, status_code=202)
 
-@app.post("/scrape")
-async def scrape(request: ScrapeRequest) -> JSONResponse:
-    if not manager.active:
-        return JSONResponse({"error": "WebSocket not connected."}, status_code=400)
 
-    await run_scrape(request.keyword, request.location, False)
-    return JSONResponse({"status": "started"})
+@app.get("/jobs")
+async def list_jobs() -> JSONResponse:
+    return JSONResponse({"jobs": [job.to_dict() for job in scheduler.list_jobs()]})
 
 
-@app.get("/download")
-async def download_results() -> FileResponse:
-    if not os.path.exists(LATEST_XLSX):
-        return FileResponse(
-            os.path.join(BASE_DIR, "index.html"),
-            media_type="text/html",
-        )
-    return FileResponse(
-        LATEST_XLSX,
-        filename=f"leads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx",
+def _get_job_or_404(job_id: str) -> Job:
+    job = scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str) -> JSONResponse:
+    job = _get_job_or_404(job_id)
+    body = job.to_dict()
+    body["queue_position"] = scheduler.queue_position(job)
+    return JSONResponse(body)
+
+
+@app.get("/jobs/{job_id}/normalized")
+async def normalized_leads(job_id: str, weights: Optional[str] = None, deduplicate: bool = True) -> JSONResponse:
+    """The job's leads after normalization, best score first; ``weights`` overrides LEAD_SCORE_WEIGHTS."""
+    if scheduler.get(job_id) is None and not lead_store.job_version(job_id)[0]:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    try:
+        score_weights = parse_weights(weights) if weights else LEAD_SCORE_WEIGHTS
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    def build() -> Dict[str, Any]:
+        leads = [lead for batch in lead_store.iter_job_leads(job_id) for lead in batch]
+        frame = normalize_leads(leads, country_code=PHONE_COUNTRY_CODE, weights=score_weights)
+        kept = dedupe(frame) if deduplicate else frame
+        kept = kept.sort_values("Score", ascending=False, kind="stable")
+        return {
+            "job_id": job_id,
+            "count": len(kept),
+            "duplicates_removed": len(frame) - len(kept),
+            "weights": score_weights,
+            "leads": to_records(kept),
+        }
+
+    loop = asyncio.get_event_loop()
+    started = time.perf_counter()
+    body = await loop.run_in_executor(None, build)
+    metrics_registry.observe("normalize", time.perf_counter() - started)
+    return JSONResponse(body)
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str) -> JSONResponse:
+    _get_job_or_404(job_id)
+    return JSONResponse(_cancel_job(job_id).to_dict())
+
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str) -> JSONResponse:
+    job = _resume_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No checkpoint for this job.")
+    body = job.to_dict()
+    body["queue_position"] = scheduler.queue_position(job)
+    return JSONResponse(body, status_code=202)
+
+
+@app.post("/batches")
+async def submit_batch(request: Request, stream: bool = False):
+    """Bulk jobs from a keyword/location matrix (JSON or CSV body).
+
+    Job options come from the JSON body or, for CSV, the query string.
+    """
+    options = {key: value for key, value in request.query_params.items() if key != "stream"}
+    try:
+        pairs, body_options = parse_matrix(await request.body(), request.headers.get("content-type", ""))
+        options.update(body_options)
+        batch = batch_runner.submit(pairs, options)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if stream:
+        return StreamingResponse(batch.stream(), media_type="application/x-ndjson")
+    body = batch.to_dict()
+    body["stream_url"] = f"/batches/{batch.id}/stream"
+    return JSONResponse(body, status_code=202)
+
+
+@app.get("/batches")
+async def list_batches() -> JSONResponse:
+    return JSONResponse({"batches": [batch.to_dict() for batch in batch_runner.batches.values()]})
+
+
+def _get_batch_or_404(batch_id: str):
+    batch = batch_runner.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return batch
+
+
+@app.get("/batches/{batch_id}")
+async def batch_status(batch_id: str) -> JSONResponse:
+    batch = _get_batch_or_404(batch_id)
+    body = batch.to_dict()
+    body["pairs"] = [
+        {
+            "keyword": keyword,
+            "location": location,
+            "job_id": batch.job_ids.get(index),
+            "status": batch.pair_status.get(index, "pending"),
+        }
+        for index, (keyword, location) in enumerate(batch.pairs)
+    ]
+    return JSONResponse(body)
+
+
+@app.get("/batches/{batch_id}/stream")
+async def stream_batch(batch_id: str) -> StreamingResponse:
+    return StreamingResponse(_get_batch_or_404(batch_id).stream(), media_type="application/x-ndjson")
+
+
+@app.post("/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str) -> JSONResponse:
+    batch = batch_runner.cancel(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return JSONResponse(batch.to_dict())
+
+
+@app.get("/checkpoints")
+async def list_checkpoints() -> JSONResponse:
+    loop = asyncio.get_event_loop()
+    checkpoints = await loop.run_in_executor(None, checkpoint_store.list)
+    return JSONResponse({
+        "checkpoints": [
+            {
+                "job_id": item["job_id"],
+                "job": item.get("job"),
+                "index": item.get("index", 0),
+                "leads": len(item.get("leads", [])),
+                "auto_resume": item.get("auto_resume", False),
+                "queued": item.get("queued", False),
+                "updated_at": item.get("updated_at"),
+            }
+            for item in checkpoints
+        ]
+    })
+
+
+@app.get("/profiles")
+async def list_profiles() -> JSONResponse:
+    return JSONResponse({"profiles": profile_store.list(), "max_bytes": PROFILE_MAX_BYTES})
+
+
+@app.get("/profiles/{job_id}")
+async def download_profile(job_id: str) -> FileResponse:
+    path = profile_store.path(os.path.basename(job_id))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No profile for this job.")
+    return FileResponse(path, filename=f"profile_{job_id}.zip", media_type="application/zip")
+
+
+@app.get("/leads")
+async def list_leads(
+    job_id: Optional[str] = None,
+    keyword: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    has_email: Optional[bool] = None,
+    page: int = 1,
+    page_size: int = 50,
+) -> JSONResponse:
+    page = max(1, page)
+    page_size = max(1, min(page_size, 500))
+    loop = asyncio.get_event_loop()
+    result = await loop.run_in_executor(
+        None,
+        lambda: lead_store.query(job_id, keyword, min_rating, max_rating, has_email, page, page_size),
     )
+    return JSONResponse(result)
 
 
-@app.get("/download-csv")
-async def download_csv() -> FileResponse:
-    if not os.path.exists(LATEST_CSV):
-        return FileResponse(
-            os.path.join(BASE_DIR, "index.html"),
-            media_type="text/html",
-        )
+def _resolve_download(job_id: Optional[str]) -> Optional[str]:
+    if not job_id:
+        job = scheduler.latest_finished()
+        return job.id if job else None
+    if scheduler.get(job_id) is not None or lead_store.job_version(job_id)[0]:
+        return job_id
+    return None
+
+
+def _no_results() -> FileResponse:
     return FileResponse(
-        LATEST_CSV,
-        filename=f"leads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv",
+        os.path.join(BASE_DIR, "index.html"),
+        media_type="text/html",
     )
+
+
+def _download_name(extension: str) -> str:
+    return f"leads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+@app.get("/download")
+async def download_results(job_id: Optional[str] = None) -> FileResponse:
+    job_id = _resolve_download(job_id)
+    if not job_id:
+        return _no_results()
+    loop = asyncio.get_event_loop()
+    started = time.perf_counter()
+    path = await loop.run_in_executor(None, xlsx_exporter.build, lead_store, job_id)
+    metrics_registry.observe("export_xlsx", time.perf_counter() - started)
+    return FileResponse(path, filename=_download_name("xlsx"))
+
+
+def _stream_download(body: Any, media_type: str, extension: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{_download_name(extension)}"'},
+    )
+
+
+@app.get("/download-csv")
+async def download_csv(job_id: Optional[str] = None):
+    job_id = _resolve_download(job_id)
+    if not job_id:
+        return _no_results()
+    return _stream_download(iter_csv(lead_store, job_id), "text/csv; charset=utf-8", "csv")
+
+
+@app.get("/download-ndjson")
+async def download_ndjson(job_id: Optional[str] = None):
+    job_id = _resolve_download(job_id)
+    if not job_id:
+        return _no_results()
+    return _stream_download(iter_ndjson(lead_store, job_id), "application/x-ndjson", "ndjson")
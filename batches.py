@@ -0,0 +1,303 @@
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from hub import PubSubHub
+from jobs import CANCELLED, COMPLETED, FAILED, Job, JobScheduler
+from lead_store import lead_keys
+
+Pair = Tuple[str, str]
+
+MAX_BATCH_PAIRS = 5000
+BATCH_HISTORY_LIMIT = 50
+
+
+def _clean(value: Any) -> str:
+    return " ".join(str(value or "").split())
+
+
+def parse_matrix(body: bytes, content_type: str) -> Tuple[List[Pair], Dict[str, Any]]:
+    """Read keyword/location pairs and sub-job options from a request body.
+
+    JSON takes ``{"pairs": [{"keyword": ..., "location": ...}]}`` and/or
+    ``{"keywords": [...], "locations": [...]}`` (every keyword in every
+    location), plus job options next to them. CSV takes ``keyword,location``
+    rows, with or without that header, and no options. Pairs are
+    deduplicated case-insensitively. Raises ``ValueError`` on bad input.
+    """
+    options: Dict[str, Any] = {}
+    raw: List[Pair] = []
+    if "json" in content_type:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as exc:
+            raise ValueError(f"Invalid JSON: {exc}") from exc
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object.")
+        for item in payload.pop("pairs", None) or []:
+            if isinstance(item, dict):
+                raw.append((_clean(item.get("keyword")), _clean(item.get("location"))))
+            elif isinstance(item, (list, tuple)) and len(item) == 2:
+                raw.append((_clean(item[0]), _clean(item[1])))
+            else:
+                raise ValueError("Each pair needs a keyword and a location.")
+        keywords = payload.pop("keywords", None) or []
+        locations = payload.pop("locations", None) or []
+        raw.extend((_clean(keyword), _clean(location)) for keyword in keywords for location in locations)
+        options = payload
+    else:
+        rows = csv.reader(io.StringIO(body.decode("utf-8-sig", errors="replace")))
+        for index, row in enumerate(rows):
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"CSV row {index + 1} needs a keyword and a location.")
+            if index == 0 and [cell.strip().lower() for cell in row[:2]] == ["keyword", "location"]:
+                continue
+            raw.append((_clean(row[0]), _clean(row[1])))
+
+    pairs: Dict[Pair, Pair] = {}
+    for keyword, location in raw:
+        if keyword and location:
+            pairs.setdefault((keyword.lower(), location.lower()), (keyword, location))
+    if not pairs:
+        raise ValueError("No keyword/location pairs found.")
+    if len(pairs) > MAX_BATCH_PAIRS:
+        raise ValueError(f"A batch is limited to {MAX_BATCH_PAIRS} pairs ({len(pairs)} given).")
+    return list(pairs.values()), options
+
+
+class Batch:
+    """One bulk request: its pairs, the leads merged across them and an event log.
+
+    The event log is what ``/batches/{id}/stream`` sends as NDJSON; every
+    stream replays it from the start and then follows new events, so
+    clients can reconnect without losing anything.
+    """
+
+    def __init__(self, pairs: List[Pair], options: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.pairs = pairs
+        self.options = options
+        self.status = "running"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.job_ids: Dict[int, str] = {}
+        self.pair_status: Dict[int, str] = {}
+        self.leads: Dict[str, Dict[str, Any]] = {}
+        # Every key of a merged lead -> its key in ``leads``.
+        self._keys: Dict[str, str] = {}
+        self.duplicates = 0
+        self.events: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+        # Sub-job id -> keys in ``leads`` of the leads it added. A lead's key is
+        # its first ``lead_keys`` key, so enrichment updates find it even when
+        # names repeat.
+        self._owned: Dict[str, Set[str]] = {}
+        self._changed = asyncio.Event()
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _count(self, *statuses: str) -> int:
+        return sum(1 for status in self.pair_status.values() if status in statuses)
+
+    def progress(self) -> Dict[str, Any]:
+        done = self._count(COMPLETED, FAILED, CANCELLED)
+        elapsed = (self.finished_at or time.time()) - self.created_at
+        remaining = len(self.pairs) - done
+        eta = elapsed / done * remaining if done and remaining and self.status == "running" else None
+        return {
+            "pairs_total": len(self.pairs),
+            "pairs_done": done,
+            "pairs_failed": self._count(FAILED),
+            "pairs_running": self._count("running"),
+            "leads": len(self.leads),
+            "duplicates": self.duplicates,
+            "elapsed_seconds": round(elapsed, 1),
+            "leads_per_minute": round(len(self.leads) / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "options": self.options,
+            **self.progress(),
+        }
+
+    def pair_started(self, index: int, job: Job) -> None:
+        self.job_ids[index] = job.id
+        self.pair_status[index] = "running"
+        self._owned[job.id] = set()
+        keyword, location = self.pairs[index]
+        self._emit({"type": "pair", "status": "running", "keyword": keyword, "location": location, "job_id": job.id})
+
+    def pair_finished(self, index: int, job: Job) -> None:
+        self.pair_status[index] = job.status
+        keyword, location = self.pairs[index]
+        self._emit(
+            {
+                "type": "pair",
+                "status": job.status,
+                "keyword": keyword,
+                "location": location,
+                "job_id": job.id,
+                "leads": job.lead_count,
+                "new_leads": len(self._owned.pop(job.id, set())),
+                "cached": job.cached,
+                "error": job.error,
+            }
+        )
+        self._emit({"type": "progress", **self.progress()})
+
+    def on_message(self, index: int, job_id: str, message: str) -> None:
+        """Hub listener for one sub-job: merges its leads into the batch."""
+        keyword, location = self.pairs[index]
+        if message.startswith("__LEAD__:"):
+            lead = json.loads(message[len("__LEAD__:"):])
+            keys = lead_keys(lead)
+            known = next((self._keys[key] for key in keys if key in self._keys), None)
+            if known is not None:
+                for key in keys:
+                    self._keys.setdefault(key, known)
+                self.duplicates += 1
+                return
+            key = keys[0]
+            for other in keys:
+                self._keys[other] = key
+            self.leads[key] = lead
+            self._owned.setdefault(job_id, set()).add(key)
+            self._emit({"type": "lead", "keyword": keyword, "location": location, "job_id": job_id, "lead": lead})
+        elif message.startswith("__ENRICH__:"):
+            update = json.loads(message[len("__ENRICH__:"):])
+            key = lead_keys(update)[0]
+            if key not in self._owned.get(job_id, ()):
+                return
+            lead = self.leads[key]
+            lead["Email"] = update.get("Email")
+            lead["Social Links"] = update.get("Social Links") or None
+            self._emit(
+                {
+                    "type": "enrich",
+                    "job_id": job_id,
+                    "name": lead.get("Name"),
+                    "email": lead["Email"],
+                    "social_links": update.get("Social Links") or [],
+                }
+            )
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        self._emit({"type": "done", **self.to_dict()})
+
+    async def stream(self) -> AsyncIterator[str]:
+        yield json.dumps({"type": "batch", **self.to_dict()}, ensure_ascii=False) + "\n"
+        cursor = 0
+        while True:
+            changed = self._changed
+            while cursor < len(self.events):
+                yield json.dumps(self.events[cursor], ensure_ascii=False) + "\n"
+                cursor += 1
+            if self.finished_at is not None:
+                return
+            await changed.wait()
+
+
+class BatchRunner:
+    """Expands batches into sub-jobs on the shared ``JobScheduler``.
+
+    At most ``concurrency`` sub-jobs from all batches together are queued
+    or running at once, so a large matrix never floods the scheduler and
+    single jobs submitted meanwhile still get a turn.
+    """
+
+    def __init__(
+        self,
+        scheduler: JobScheduler,
+        hub: PubSubHub,
+        make_job: Callable[[str, str, Dict[str, Any]], Job],
+        concurrency: int = 1,
+    ) -> None:
+        self.scheduler = scheduler
+        self.hub = hub
+        self.make_job = make_job
+        self.concurrency = max(1, concurrency)
+        self.batches: Dict[str, Batch] = {}
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    def submit(self, pairs: List[Pair], options: Dict[str, Any]) -> Batch:
+        # Builds one job up front so invalid options fail the request, not the batch.
+        self.make_job(*pairs[0], options)
+        batch = Batch(pairs, options)
+        self.batches[batch.id] = batch
+        batch.task = asyncio.create_task(self._run(batch))
+        self._trim_history()
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self.batches.get(batch_id)
+
+    def cancel(self, batch_id: str) -> Optional[Batch]:
+        batch = self.batches.get(batch_id)
+        if batch is not None and batch.task is not None and not batch.task.done():
+            batch.task.cancel()
+        return batch
+
+    async def stop(self) -> None:
+        tasks = [batch.task for batch in self.batches.values() if batch.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_pair(self, batch: Batch, index: int) -> None:
+        async with self._slots:
+            keyword, location = batch.pairs[index]
+            job = self.make_job(keyword, location, batch.options)
+
+            def listener(message: str) -> None:
+                batch.on_message(index, job.id, message)
+
+            self.hub.listen(job.id, listener)
+            try:
+                batch.pair_started(index, self.scheduler.submit(job))
+                await self.scheduler.wait(job)
+            except asyncio.CancelledError:
+                self.scheduler.cancel(job.id)
+                batch.pair_status[index] = CANCELLED
+                raise
+            finally:
+                self.hub.unlisten(job.id, listener)
+            batch.pair_finished(index, job)
+
+    async def _run(self, batch: Batch) -> None:
+        tasks = [asyncio.create_task(self._run_pair(batch, index)) for index in range(len(batch.pairs))]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            batch.finish(CANCELLED)
+            raise
+        except Exception as exc:
+            batch.finish(FAILED)
+            print(f"Batch {batch.id} failed: {exc}")
+        else:
+            batch.finish(COMPLETED)
+
+    def _trim_history(self) -> None:
+        finished = [batch for batch in self.batches.values() if batch.finished_at is not None]
+        excess = len(self.batches) - BATCH_HISTORY_LIMIT
+        for batch in sorted(finished, key=lambda item: item.finished_at or 0)[:max(0, excess)]:
+            del self.batches[batch.id]
@@ -0,0 +1,105 @@
+"""Per-lead latency of the detail-panel extraction engines.
+
+Renders a synthetic Maps-like feed + detail panel in headless Chromium and
+times ``_extract_details_with_selectors`` (one IPC call per selector) against
+``_extract_details`` (single ``page.evaluate`` snapshot).
+
+Run from the repository root::
+
+    python -m benchmarks.bench_extraction --cards 50 --rounds 5
+
+Results are printed and written to ``benchmarks/results/extraction.json``.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from playwright.sync_api import sync_playwright
+
+from scraper import _extract_details, _extract_details_with_selectors, launch_browser
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _synthetic_page(cards):
+    articles = "".join(
+        f"""
+        <div role="article">
+          <a href="https://www.google.com/maps/place/Business+{idx}"></a>
+          <div>Business {idx}</div>
+          <span role="img" aria-label="4.{idx % 10} stars {idx * 7} Reviews"></span>
+          <div>Plumber · 12{idx} Main St</div>
+        </div>"""
+        for idx in range(cards)
+    )
+    return f"""
+    <html><body>
+      <div role="feed">{articles}</div>
+      <div role="main">
+        <h1 class="DUwDvf">Business 0</h1>
+        <span aria-label="4.5 stars 120 Reviews"></span>
+        <button data-item-id="phone:tel:+15551234567">+1 555-123-4567</button>
+        <a data-item-id="authority" href="https://business0.example.com/"></a>
+      </div>
+    </body></html>
+    """
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _time_engine(page, extract, cards, rounds):
+    samples = []
+    for _ in range(rounds):
+        for idx in range(cards):
+            card = page.locator("div[role='feed'] div[role='article']").nth(idx)
+            started = time.perf_counter()
+            extract(page, card, idx)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "leads": len(samples),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    engines = {
+        "selectors": lambda page, card, idx: _extract_details_with_selectors(page, card),
+        "evaluate": _extract_details,
+    }
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        page = browser.new_page()
+        page.set_content(_synthetic_page(args.cards))
+        results = {name: _time_engine(page, extract, args.cards, args.rounds) for name, extract in engines.items()}
+        browser.close()
+
+    report = {
+        "benchmark": "extraction",
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "cards": args.cards,
+        "rounds": args.rounds,
+        "engines": results,
+        "speedup_p50": round(results["selectors"]["p50_ms"] / results["evaluate"]["p50_ms"], 2),
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "extraction.json"), "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
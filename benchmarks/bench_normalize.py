@@ -0,0 +1,163 @@
+"""Per-lead cost of the normalization and scoring pipeline.
+
+Builds synthetic leads with the formats Maps and lead websites actually
+produce (national and international phones, websites with and without
+scheme/``www``/paths, mixed-case emails, social links for several networks,
+duplicates) and times ``normalize.normalize_leads`` plus ``dedupe`` on them.
+For comparison it also runs the per-lead path the rest of the code uses
+(``lead_store.lead_keys`` in a Python loop), which only deduplicates: no
+E.164, socials or score.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_normalize --rows 100000 --repeat 3
+
+Each report is written to ``benchmarks/results/normalize-<timestamp>.json``
+and copied to ``normalize-latest.json``.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+from datetime import datetime
+
+from lead_store import lead_keys
+from normalize import dedupe, normalize_leads
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+PHONE_FORMATS = [
+    "({a}) {b}-{c}",
+    "+1 {a}-{b}-{c}",
+    "{a}.{b}.{c}",
+    "1{a}{b}{c}",
+    "+44 20 {b} {c}",
+    "0044 20 {b} {c}",
+    "0{a}{b}{c}",
+]
+WEBSITE_FORMATS = [
+    "https://www.{name}.com/",
+    "http://{name}.com/contact?ref=maps",
+    "{name}.net",
+    "https://shop.{name}.co.uk/en/",
+    "HTTPS://WWW.{upper}.COM",
+]
+SOCIAL_FORMATS = [
+    "https://www.facebook.com/{name}",
+    "https://instagram.com/{name}/",
+    "https://www.linkedin.com/company/{name}",
+    "https://x.com/{name}",
+    "https://m.youtube.com/@{name}",
+]
+
+
+def synthetic_leads(rows, seed=7, duplicate_rate=0.1):
+    rng = random.Random(seed)
+    leads = []
+    for index in range(rows):
+        if leads and rng.random() < duplicate_rate:
+            # Same business seen again, formatted differently.
+            copy = dict(rng.choice(leads))
+            copy["Phone"] = copy["Phone"].replace("-", " ") if copy["Phone"] else None
+            copy["Email"] = None
+            leads.append(copy)
+            continue
+        name = f"business{index}"
+        digits = {"a": f"{rng.randint(200, 999)}", "b": f"{rng.randint(200, 999)}", "c": f"{rng.randint(0, 9999):04d}"}
+        leads.append(
+            {
+                "Name": f"Business  {index}",
+                "Phone": rng.choice(PHONE_FORMATS).format(**digits) if rng.random() < 0.85 else None,
+                "Website": rng.choice(WEBSITE_FORMATS).format(name=name, upper=name.upper())
+                if rng.random() < 0.7
+                else None,
+                "Rating": round(rng.uniform(1, 5), 1) if rng.random() < 0.9 else None,
+                "Review Count": rng.randint(0, 5000) if rng.random() < 0.9 else None,
+                "Social Links": [fmt.format(name=name) for fmt in rng.sample(SOCIAL_FORMATS, rng.randint(0, 3))]
+                or None,
+                "Email": rng.choice([f"Info@{name.upper()}.com", f"sales@{name}.net", "not-an-email"])
+                if rng.random() < 0.5
+                else None,
+            }
+        )
+    return leads
+
+
+def _per_lead_baseline(leads):
+    seen, unique = set(), 0
+    for lead in leads:
+        keys = lead_keys(lead)
+        if seen.isdisjoint(keys):
+            unique += 1
+        seen.update(keys)
+    return unique
+
+
+def _best_of(repeat, func, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--label", default=None, help="free-form note stored with the report")
+    args = parser.parse_args()
+
+    leads = synthetic_leads(args.rows)
+    # Imports pandas and warms its regex caches outside the timed runs.
+    normalize_leads(leads[:100])
+
+    normalize_seconds, frame = _best_of(args.repeat, normalize_leads, leads)
+    dedupe_seconds, unique = _best_of(args.repeat, dedupe, frame)
+    baseline_seconds, baseline_unique = _best_of(args.repeat, _per_lead_baseline, leads)
+
+    total = normalize_seconds + dedupe_seconds
+    report = {
+        "benchmark": "normalize",
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "label": args.label,
+        "rows": args.rows,
+        "normalize_seconds": round(normalize_seconds, 3),
+        "dedupe_seconds": round(dedupe_seconds, 3),
+        "per_lead_us": round(total / args.rows * 1e6, 2),
+        "leads_per_sec": round(args.rows / total),
+        "unique_leads": len(unique),
+        "phones_e164": int(frame["Phone E164"].notna().sum()),
+        "domains": int(frame["Domain"].notna().sum()),
+        "emails": int(frame["Email"].notna().sum()),
+        "mean_score": round(float(frame["Score"].mean()), 1),
+        "baseline_per_lead_us": round(baseline_seconds / args.rows * 1e6, 2),
+        "baseline_unique_leads": baseline_unique,
+    }
+    print(
+        f"{args.rows} leads: normalize {normalize_seconds:.3f} s + dedupe {dedupe_seconds:.3f} s = "
+        f"{report['per_lead_us']} us/lead ({report['leads_per_sec']} leads/s)"
+    )
+    print(
+        f"  {report['unique_leads']} unique, {report['phones_e164']} E.164 phones, {report['domains']} domains, "
+        f"{report['emails']} emails, mean score {report['mean_score']}"
+    )
+    print(
+        f"  per-lead Python keys: {report['baseline_per_lead_us']} us/lead "
+        f"({report['baseline_unique_leads']} unique, no E.164/socials/score)"
+    )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"normalize-{report['timestamp'].replace(':', '')}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    shutil.copyfile(path, os.path.join(RESULTS_DIR, "normalize-latest.json"))
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
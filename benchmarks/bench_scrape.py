@@ -0,0 +1,283 @@
+"""End-to-end scraper throughput against the local Maps stand-in.
+
+Starts ``benchmarks.maps_standin``, points the scraper at it through
+``MAPS_BASE_URL`` and runs ``scrape_google_maps`` once per feed size, with
+and without deep_search. Each run reports leads/sec, the per-lead latency
+percentiles (time between consecutive captured leads), peak RSS of this
+process and of the browser processes, and the CPU time the browser used.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_scrape --sizes 20 100 500 2000
+    python -m benchmarks.bench_scrape --sizes 100 --tabs 4 --compare benchmarks/results/scrape-latest.json
+
+Each report is written to ``benchmarks/results/scrape-<timestamp>.json``
+and copied to ``scrape-latest.json``; ``--compare`` prints the leads/sec
+change against an earlier report. RSS and CPU figures need Linux ``/proc``.
+
+Each run gets its own ``PacingController`` with no delay, so runs don't
+inherit each other's back-offs and stay comparable with reports from before
+adaptive pacing. ``--paced`` uses the production pacing defaults instead
+(still fresh per run); paced runs are only compared with paced runs.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.maps_standin import MapsStandIn, load_listings, synthetic_listings
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SAMPLE_SECONDS = 0.2
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _read_processes():
+    """``pid -> (ppid, cpu_seconds, rss_bytes)`` for every process in ``/proc``."""
+    processes = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # Fields after the command name: state, ppid, ..., utime (11), stime (12), ..., rss (21).
+        cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        processes[int(entry)] = (int(fields[1]), cpu, int(fields[21]) * PAGE_SIZE)
+    return processes
+
+
+class ResourceSampler:
+    """Samples RSS of this process and of its descendants (the Playwright
+    driver and Chromium) on a background thread, and their CPU time."""
+
+    def __init__(self, interval=SAMPLE_SECONDS):
+        self.interval = interval
+        self.available = os.path.isdir("/proc")
+        self.peak_self_rss = 0
+        self.peak_browser_rss = 0
+        self.peak_total_rss = 0
+        self._cpu = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    def _sample(self):
+        processes = _read_processes()
+        root = os.getpid()
+        children = {}
+        for pid, (ppid, _, _) in processes.items():
+            children.setdefault(ppid, []).append(pid)
+        descendants, stack = [], list(children.get(root, []))
+        while stack:
+            pid = stack.pop()
+            descendants.append(pid)
+            stack.extend(children.get(pid, []))
+        browser_rss = 0
+        for pid in descendants:
+            _, cpu, rss = processes[pid]
+            # Exited processes keep their last reading.
+            self._cpu[pid] = max(cpu, self._cpu.get(pid, 0.0))
+            browser_rss += rss
+        self_rss = processes.get(root, (0, 0.0, 0))[2]
+        self.peak_self_rss = max(self.peak_self_rss, self_rss)
+        self.peak_browser_rss = max(self.peak_browser_rss, browser_rss)
+        self.peak_total_rss = max(self.peak_total_rss, self_rss + browser_rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.available:
+            self._sample()
+            self._baseline = dict(self._cpu)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.available:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+    def report(self):
+        if not self.available:
+            return {"peak_rss_mb": None, "browser_cpu_seconds": None}
+        cpu = sum(value - self._baseline.get(pid, 0.0) for pid, value in self._cpu.items())
+        return {
+            "peak_rss_mb": {
+                "python": round(self.peak_self_rss / 1_048_576, 1),
+                "browser": round(self.peak_browser_rss / 1_048_576, 1),
+                "total": round(self.peak_total_rss / 1_048_576, 1),
+            },
+            "browser_cpu_seconds": round(cpu, 2),
+        }
+
+
+def _run_once(scraper, standin, listings, size, deep_search, tabs, resource_policy, paced=False):
+    from playwright.sync_api import sync_playwright
+
+    from metrics import JobMetrics
+    from pacing import PacingController
+
+    standin.listings = listings[:size]
+    captured = []
+    seen = set()
+
+    def lead_callback(lead):
+        if id(lead) not in seen:
+            seen.add(id(lead))
+            captured.append(time.perf_counter())
+
+    job_metrics = JobMetrics()
+    with sync_playwright() as p, ResourceSampler() as sampler:
+        browser = scraper.launch_browser(p)
+        try:
+            context = scraper.new_stealth_context(browser)
+            started = time.perf_counter()
+            leads = scraper.scrape_google_maps(
+                "plumber",
+                "Springfield",
+                None,
+                max_results=size,
+                deep_search=deep_search,
+                context=context,
+                max_parallel_tabs=tabs,
+                resource_policy=resource_policy,
+                lead_callback=lead_callback,
+                metrics=job_metrics,
+                pacer=PacingController() if paced else PacingController(min_delay=0, initial_delay=0),
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            browser.close()
+
+    gaps = [(later - earlier) * 1000 for earlier, later in zip([started] + captured, captured)]
+    phases = job_metrics.summary()["phases"]
+    result = {
+        "feed_size": size,
+        "deep_search": deep_search,
+        "paced": paced,
+        "leads": len(leads),
+        "emails": sum(1 for lead in leads if lead.get("Email")),
+        "seconds": round(elapsed, 2),
+        "leads_per_sec": round(len(leads) / elapsed, 2) if elapsed > 0 else 0.0,
+        "lead_latency_ms": {
+            "mean": round(statistics.mean(gaps), 1),
+            "p50": round(_percentile(gaps, 50), 1),
+            "p90": round(_percentile(gaps, 90), 1),
+            "p99": round(_percentile(gaps, 99), 1),
+            "max": round(max(gaps), 1),
+        } if gaps else None,
+        "phases_p50_ms": {phase: stats["p50_ms"] for phase, stats in phases.items()},
+    }
+    result.update(sampler.report())
+    if result["browser_cpu_seconds"] is not None and elapsed > 0:
+        result["browser_cpu_percent"] = round(result["browser_cpu_seconds"] / elapsed * 100, 1)
+    return result
+
+
+def _compare(report, baseline, baseline_path):
+    # Reports from before pacing existed count as unpaced.
+    previous = {(run["feed_size"], run["deep_search"], run.get("paced", False)): run for run in baseline["runs"]}
+    print(f"\nCompared with {baseline_path} ({baseline.get('timestamp')}):")
+    for run in report["runs"]:
+        before = previous.get((run["feed_size"], run["deep_search"], run["paced"]))
+        if not before or not before["leads_per_sec"]:
+            continue
+        change = (run["leads_per_sec"] / before["leads_per_sec"] - 1) * 100
+        mode = "deep" if run["deep_search"] else "plain"
+        print(
+            f"  {run['feed_size']:>5} {mode:<5} {before['leads_per_sec']:>8.2f} -> "
+            f"{run['leads_per_sec']:>8.2f} leads/s ({change:+.1f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 500, 2000])
+    parser.add_argument("--modes", nargs="+", choices=["plain", "deep"], default=["plain", "deep"])
+    parser.add_argument("--tabs", type=int, default=1, help="max_parallel_tabs passed to the scraper")
+    parser.add_argument("--resource-policy", default=None)
+    parser.add_argument("--paced", action="store_true", help="pace Maps requests with the production defaults")
+    parser.add_argument("--listings-file", help="JSON list of recorded listings instead of synthetic ones")
+    parser.add_argument("--feed-latency", type=float, default=0.2)
+    parser.add_argument("--detail-latency", type=float, default=0.03)
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    parser.add_argument("--label", default=None, help="free-form note stored with the report")
+    parser.add_argument("--compare", help="earlier report to compare leads/sec against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        # Read it now: it may be the scrape-latest.json this run replaces.
+        with open(args.compare, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    listings = load_listings(args.listings_file) if args.listings_file else synthetic_listings(max(args.sizes))
+    standin = MapsStandIn(
+        listings,
+        feed_latency=args.feed_latency,
+        detail_latency=args.detail_latency,
+        site_latency=args.site_latency,
+    ).start()
+    # scraper reads MAPS_BASE_URL at import time, so it is imported only
+    # once the stand-in's address is known.
+    os.environ["MAPS_BASE_URL"] = standin.maps_url
+    import scraper
+
+    runs = []
+    try:
+        for deep_search in [mode == "deep" for mode in args.modes]:
+            for size in args.sizes:
+                if size > len(listings):
+                    print(f"Skipping feed size {size}: only {len(listings)} listings.")
+                    continue
+                result = _run_once(
+                    scraper, standin, listings, size, deep_search, args.tabs, args.resource_policy, args.paced
+                )
+                runs.append(result)
+                latency = result["lead_latency_ms"] or {}
+                print(
+                    f"size={size:<5} deep={str(deep_search):<5} leads={result['leads']:<5} "
+                    f"{result['leads_per_sec']:>7.2f} leads/s  p50={latency.get('p50')} ms  "
+                    f"p99={latency.get('p99')} ms  browser_cpu={result['browser_cpu_seconds']} s"
+                )
+    finally:
+        standin.stop()
+
+    report = {
+        "benchmark": "scrape",
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "label": args.label,
+        "tabs": args.tabs,
+        "resource_policy": args.resource_policy,
+        "paced": args.paced,
+        "latency": {"feed": args.feed_latency, "detail": args.detail_latency, "site": args.site_latency},
+        "website_hosts": standin.site_host_count,
+        "runs": runs,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"scrape-{report['timestamp'].replace(':', '')}.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    shutil.copyfile(path, os.path.join(RESULTS_DIR, "scrape-latest.json"))
+    print(f"Saved {path}")
+    if baseline is not None:
+        _compare(report, baseline, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""Local stand-in for Google Maps and the business websites it links to.
+
+Serves just enough of the Maps DOM for ``scraper.scrape_google_maps`` to run
+unchanged against it: a search box, a ``div[role='feed']`` of
+``div[role='article']`` cards that grows by one page per scroll, a detail
+panel (``h1.DUwDvf``, ``data-item-id='phone:...'``, ``authority``) loaded on
+click, standalone place pages for the multi-tab mode, and one small website
+per business, some with the email on the homepage, some only on a contact
+page, some rendered by JavaScript and some without any email.
+
+Point the scraper at it with ``MAPS_BASE_URL``::
+
+    python -m benchmarks.maps_standin --listings 500 --port 8765
+    MAPS_BASE_URL=http://127.0.0.1:8765/maps python app.py
+
+Listings are synthetic unless ``--listings-file`` names a JSON list of
+recorded ones (``name``, ``phone``, ``website``, ``rating``, ``reviews``,
+``category``, ``address``); their websites are replaced by local sites.
+"""
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, quote_plus, unquote_plus, urlsplit
+
+CATEGORIES = ["Plumber", "Electrician", "Dentist", "Bakery", "Cafe", "Florist", "Locksmith", "Barber"]
+STREETS = ["Main St", "Oak Ave", "Maple Rd", "Cedar Ln", "Pine St", "Elm Blvd", "Lake Dr", "Hill Rd"]
+# How each business website exposes its contact details, by index modulo 4.
+SITE_VARIANTS = ("homepage_email", "contact_page", "javascript", "no_email")
+FILLER = (
+    "We have proudly served the neighbourhood for over twenty years with fast, friendly and reliable "
+    "service. Call us for a free estimate or visit our showroom during opening hours. "
+)
+
+FEED_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title} - Google Maps</title>
+<style>
+  body {{ margin: 0; font-family: sans-serif; }}
+  #feed {{ position: absolute; left: 0; top: 0; bottom: 0; width: 420px; overflow-y: auto; }}
+  #feed div[role='article'] {{ height: 96px; padding: 8px; border-bottom: 1px solid #ddd; cursor: pointer; }}
+  #panel {{ margin-left: 440px; padding: 16px; }}
+</style></head>
+<body>
+<div role="feed" id="feed" aria-label="Results for {title}">{cards}{end}</div>
+<div role="main" id="panel"></div>
+<script>
+  const feed = document.getElementById("feed");
+  const panel = document.getElementById("panel");
+  const total = {total};
+  let loading = false;
+  const loaded = () => feed.querySelectorAll("div[role='article']").length;
+  feed.addEventListener("scroll", () => {{
+    if (loading || loaded() >= total || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 200) {{
+      return;
+    }}
+    loading = true;
+    fetch("/maps/api/feed?start=" + loaded())
+      .then((response) => response.text())
+      .then((markup) => {{
+        feed.insertAdjacentHTML("beforeend", markup);
+        if (loaded() >= total) {{
+          feed.insertAdjacentHTML("beforeend", '{end_marker}');
+        }}
+      }})
+      .finally(() => {{ loading = false; }});
+  }});
+  feed.addEventListener("click", (event) => {{
+    const card = event.target.closest("div[role='article']");
+    if (!card) {{
+      return;
+    }}
+    event.preventDefault();
+    fetch("/maps/api/place/" + card.dataset.index)
+      .then((response) => response.text())
+      .then((markup) => {{ panel.innerHTML = markup; }});
+  }});
+</script>
+</body></html>
+"""
+
+HOME_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Google Maps</title></head>
+<body>
+<input id="searchboxinput" aria-label="Search Google Maps" placeholder="Search Google Maps">
+<script>
+  document.getElementById("searchboxinput").addEventListener("keydown", (event) => {
+    if (event.key === "Enter") {
+      window.location.href = "/maps/search/" + encodeURIComponent(event.target.value);
+    }
+  });
+</script>
+</body></html>
+"""
+
+END_MARKER = "<span class=\"HlvSq\">You've reached the end of the list.</span>"
+
+
+def synthetic_listings(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    listings = []
+    for index in range(count):
+        category = CATEGORIES[index % len(CATEGORIES)]
+        listings.append(
+            {
+                "name": f"{category} {rng.choice(['Pro', 'Express', 'Family', 'City', 'Prime'])} {index + 1:04d}",
+                "category": category,
+                "address": f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+                "phone": f"+1 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}" if rng.random() < 0.9 else None,
+                "website": rng.random() < 0.8,
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "reviews": rng.randint(0, 2500),
+            }
+        )
+    return listings
+
+
+def load_listings(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, body: str, status: int = 200, content_type: str = "text/html; charset=utf-8") -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        standin: "MapsStandIn" = self.server.standin
+        parts = urlsplit(self.path)
+        path = parts.path
+        standin.requests += 1
+        if path.startswith("/site/"):
+            match = re.match(r"/site/(\d+)/(contact)?$", path)
+            body = standin.site_page(int(match.group(1)), bool(match.group(2))) if match else None
+        elif path in ("/maps", "/maps/"):
+            body = HOME_PAGE
+        elif path.startswith("/maps/search/"):
+            body = standin.feed_page(path[len("/maps/search/"):].split("/@")[0])
+        elif path == "/maps/api/feed":
+            start = int(parse_qs(parts.query).get("start", ["0"])[0])
+            time.sleep(standin.feed_latency)
+            body = standin.cards(start, start + standin.page_size)
+        elif path.startswith("/maps/api/place/"):
+            time.sleep(standin.detail_latency)
+            body = standin.detail_panel(int(path.rsplit("/", 1)[1]))
+        elif path.startswith("/maps/place/"):
+            match = re.search(r"!(\d+)$", path)
+            time.sleep(standin.detail_latency)
+            body = standin.place_page(int(match.group(1))) if match else None
+        else:
+            body = None
+        if body is None:
+            self._send("Not found", status=404, content_type="text/plain")
+        else:
+            self._send(body)
+
+
+class MapsStandIn:
+    """Threaded HTTP server playing Google Maps plus every listed website.
+
+    Business websites are spread over extra loopback addresses
+    (127.0.0.2, 127.0.0.3, ...) when the OS allows it, so per-host limits
+    in the enricher behave as they would against distinct sites. Latencies
+    are in seconds and can be changed between runs, as can ``listings``.
+    """
+
+    def __init__(
+        self,
+        listings: Optional[List[Dict[str, Any]]] = None,
+        page_size: int = 20,
+        feed_latency: float = 0.2,
+        detail_latency: float = 0.03,
+        site_latency: float = 0.05,
+        site_hosts: int = 8,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.listings = listings if listings is not None else synthetic_listings(100)
+        self.page_size = page_size
+        self.feed_latency = feed_latency
+        self.detail_latency = detail_latency
+        self.site_latency = site_latency
+        self.requests = 0
+        self._maps_server = self._bind(host, port)
+        self._site_servers = []
+        for offset in range(site_hosts):
+            try:
+                self._site_servers.append(self._bind(f"127.0.0.{offset + 2}", 0))
+            except OSError:
+                break
+        if not self._site_servers:
+            self._site_servers.append(self._maps_server)
+        self._threads: List[threading.Thread] = []
+
+    def _bind(self, host: str, port: int) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        server.standin = self
+        return server
+
+    @property
+    def maps_url(self) -> str:
+        host, port = self._maps_server.server_address[:2]
+        return f"http://{host}:{port}/maps"
+
+    @property
+    def site_host_count(self) -> int:
+        return len(self._site_servers)
+
+    def start(self) -> "MapsStandIn":
+        for server in {id(server): server for server in [self._maps_server, *self._site_servers]}.values():
+            thread = threading.Thread(target=server.serve_forever, name="maps-standin", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for server in {id(server): server for server in [self._maps_server, *self._site_servers]}.values():
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "MapsStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def website(self, index: int) -> Optional[str]:
+        if not self.listings[index].get("website"):
+            return None
+        host, port = self._site_servers[index % len(self._site_servers)].server_address[:2]
+        return f"http://{host}:{port}/site/{index}/"
+
+    def _rating_label(self, listing: Dict[str, Any]) -> str:
+        return f"{listing.get('rating') or ''} stars {listing.get('reviews') or 0} Reviews"
+
+    def cards(self, start: int, end: int) -> str:
+        markup = []
+        for index in range(start, min(end, len(self.listings))):
+            listing = self.listings[index]
+            name = html.escape(listing["name"])
+            markup.append(
+                f'<div role="article" aria-label="{name}" data-index="{index}">'
+                f'<a class="hfpxzc" href="/maps/place/{quote_plus(listing["name"])}/data=!{index}"></a>'
+                f"<div>{name}</div>"
+                f'<span role="img" aria-label="{self._rating_label(listing)}"></span>'
+                f"<div>{html.escape(listing.get('category') or '')} · {html.escape(listing.get('address') or '')}</div>"
+                "</div>"
+            )
+        return "".join(markup)
+
+    def feed_page(self, search_text: str) -> str:
+        first = self.cards(0, self.page_size)
+        return FEED_PAGE.format(
+            title=html.escape(unquote_plus(search_text)),
+            cards=first,
+            end=END_MARKER if len(self.listings) <= self.page_size else "",
+            total=len(self.listings),
+            end_marker=END_MARKER.replace("'", "\\'"),
+        )
+
+    def detail_panel(self, index: int) -> Optional[str]:
+        if not 0 <= index < len(self.listings):
+            return None
+        listing = self.listings[index]
+        markup = [
+            f'<h1 class="DUwDvf">{html.escape(listing["name"])}</h1>',
+            f'<span role="img" aria-label="{self._rating_label(listing)}"></span>',
+            f'<button data-item-id="address">{html.escape(listing.get("address") or "")}</button>',
+        ]
+        website = self.website(index)
+        if website:
+            markup.append(f'<a data-item-id="authority" href="{website}">{urlsplit(website).netloc}</a>')
+        if listing.get("phone"):
+            digits = re.sub(r"[^0-9+]", "", listing["phone"])
+            markup.append(f'<button data-item-id="phone:tel:{digits}">{html.escape(listing["phone"])}</button>')
+        return "".join(markup)
+
+    def place_page(self, index: int) -> Optional[str]:
+        panel = self.detail_panel(index)
+        if panel is None:
+            return None
+        return f'<!doctype html><html><body><div role="main">{panel}</div></body></html>'
+
+    def site_page(self, index: int, contact: bool) -> Optional[str]:
+        if not 0 <= index < len(self.listings) or not self.listings[index].get("website"):
+            return None
+        time.sleep(self.site_latency)
+        slug = re.sub(r"[^a-z0-9]+", "-", self.listings[index]["name"].lower()).strip("-")
+        email = f"info@{slug}.example.com"
+        variant = SITE_VARIANTS[index % len(SITE_VARIANTS)]
+        filler = "<p>" + FILLER * 40 + "</p>"
+        if contact:
+            return f"<html><body><h1>Contact</h1><p>Email us at {email}</p>{filler}</body></html>"
+        if variant == "javascript":
+            user, domain = email.split("@")
+            return (
+                '<html><body><div id="root"></div>'
+                "<noscript>You need to enable JavaScript to run this app.</noscript>"
+                f"<script>document.getElementById('root').innerHTML = "
+                f"'<p>Contact: ' + ['{user}', '{domain}'].join('@') + '</p>';</script>"
+                "</body></html>"
+            )
+        links = f'<a href="https://www.instagram.com/{slug}/">Instagram</a>'
+        if variant == "homepage_email":
+            links += f'<a href="https://www.facebook.com/{slug}">Facebook</a><a href="mailto:{email}">{email}</a>'
+        elif variant == "contact_page":
+            links += f'<a href="/site/{index}/contact">Contact</a>'
+        else:
+            links = f'<a href="https://www.linkedin.com/company/{slug}">LinkedIn</a>'
+        return f"<html><body><h1>{html.escape(self.listings[index]['name'])}</h1>{filler}{links}</body></html>"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100, help="number of synthetic listings")
+    parser.add_argument("--listings-file", help="JSON list of recorded listings to serve instead")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--feed-latency", type=float, default=0.2)
+    parser.add_argument("--detail-latency", type=float, default=0.03)
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    listings = load_listings(args.listings_file) if args.listings_file else synthetic_listings(args.listings)
+    standin = MapsStandIn(
+        listings,
+        feed_latency=args.feed_latency,
+        detail_latency=args.detail_latency,
+        site_latency=args.site_latency,
+        port=args.port,
+    ).start()
+    print(f"Serving {len(listings)} listings at {standin.maps_url} ({standin.site_host_count} website hosts)")
+    print(f"MAPS_BASE_URL={standin.maps_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+
+class BrowserSlot:
+    """One browser + stealth context, pinned to its own thread.
+
+    Playwright's sync API is bound to the thread that started it, so every
+    browser call for this slot (warm-up, the scrape itself, reset) goes
+    through ``executor``. Playwright and ``scraper`` are imported there on
+    first use, which keeps them off the server's import path.
+    """
+
+    def __init__(self, slot_id: int, show_browser: bool) -> None:
+        self.slot_id = slot_id
+        self.show_browser = show_browser
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"browser-slot-{slot_id}")
+        self.uses = 0
+        self.launches = 0
+        self._playwright = None
+        self.browser = None
+        self.context = None
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+
+    def warm(self) -> None:
+        from playwright.sync_api import sync_playwright
+
+        from scraper import launch_browser, new_stealth_context, open_maps_home
+
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        if self.browser is None or not self.browser.is_connected():
+            self.browser = launch_browser(self._playwright, self.show_browser)
+            self.launches += 1
+            self.context = None
+        if self.context is None:
+            self.context = new_stealth_context(self.browser)
+            open_maps_home(self.context.new_page())
+            self.uses = 0
+
+    def is_healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected() and self.context is not None
+
+    def reset(self) -> None:
+        from scraper import open_maps_home
+
+        pages = self.context.pages
+        for page in pages[1:]:
+            page.close()
+        if pages:
+            open_maps_home(pages[0])
+        else:
+            open_maps_home(self.context.new_page())
+
+    def recycle(self) -> None:
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self.context = None
+        if self.browser is not None and not self.browser.is_connected():
+            self.browser = None
+        self.warm()
+
+    def shutdown(self) -> None:
+        for resource in (self.context, self.browser):
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception:
+                pass
+        self.context = None
+        self.browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+class BrowserPool:
+    """``size`` browser slots handed out one job at a time.
+
+    ``start`` only creates the slots; browsers launch in ``prewarm`` (meant
+    to run as a background task) or, for a slot still cold, on checkout.
+    """
+
+    def __init__(self, size: int = 1, max_uses: int = 20, show_browser: bool = False) -> None:
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.show_browser = show_browser
+        self._slots: List[BrowserSlot] = []
+        self._available: Optional[asyncio.Queue] = None
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recycles: Dict[str, int] = {"max_uses": 0, "crash": 0}
+
+    async def start(self) -> None:
+        self._available = asyncio.Queue()
+        for slot_id in range(self.size):
+            slot = BrowserSlot(slot_id, self.show_browser)
+            self._slots.append(slot)
+            self._available.put_nowait(slot)
+
+    async def prewarm(self) -> None:
+        """Launch every slot's browser concurrently, each on its own thread."""
+
+        async def warm(slot: BrowserSlot) -> None:
+            try:
+                await slot.run(slot.warm)
+            except Exception as exc:
+                # Leave the slot cold; checkout() retries the warm-up.
+                print(f"Browser slot {slot.slot_id} warm-up failed: {exc}")
+
+        await asyncio.gather(*(warm(slot) for slot in self._slots))
+
+    async def stop(self) -> None:
+        for slot in self._slots:
+            try:
+                await slot.run(slot.shutdown)
+            except Exception:
+                pass
+            slot.executor.shutdown(wait=False)
+        self._slots = []
+
+    @asynccontextmanager
+    async def checkout(self) -> AsyncIterator[BrowserSlot]:
+        if self._available is None:
+            raise RuntimeError("Browser pool is not started.")
+        started = time.perf_counter()
+        slot = await self._available.get()
+        waited = time.perf_counter() - started
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+        crashed = False
+        try:
+            await slot.run(slot.warm)
+            yield slot
+        except Exception:
+            crashed = True
+            raise
+        finally:
+            slot.uses += 1
+            await self._release(slot, crashed)
+
+    async def _release(self, slot: BrowserSlot, crashed: bool) -> None:
+        reason = "crash" if crashed else None
+        try:
+            if reason is None and not await slot.run(slot.is_healthy):
+                reason = "crash"
+            if reason is None and slot.uses >= self.max_uses:
+                reason = "max_uses"
+            if reason is None:
+                try:
+                    await slot.run(slot.reset)
+                except Exception:
+                    reason = "crash"
+            if reason is not None:
+                self._recycles[reason] += 1
+                await slot.run(slot.recycle)
+        except Exception as exc:
+            print(f"Browser slot {slot.slot_id} recycle failed: {exc}")
+        finally:
+            self._available.put_nowait(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        available = self._available.qsize() if self._available else 0
+        return {
+            "size": self.size,
+            "available": available,
+            "in_use": len(self._slots) - available,
+            "max_uses": self.max_uses,
+            "checkouts": self._checkouts,
+            "checkout_wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+            "checkout_wait_max_ms": round(self._wait_max * 1000, 2),
+            "recycles": dict(self._recycles),
+            "launches": sum(slot.launches for slot in self._slots),
+            "warm": sum(1 for slot in self._slots if slot.context is not None),
+        }
@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class CheckpointStore:
+    """Progress snapshots of running scrapes, one JSON file per job.
+
+    A checkpoint holds the job parameters, the leads collected so far, the
+    scraper's ``seen`` keys and the feed index to continue from. Writes go
+    to a temporary file first so a crash mid-write keeps the previous one.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        # Ids come from clients on resume; keep them inside the directory.
+        if not job_id or ".." in job_id or "/" in job_id or "\\" in job_id:
+            raise ValueError(f"Invalid checkpoint id: {job_id!r}")
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, job_id: str, state: Dict[str, Any]) -> None:
+        path = self._path(job_id)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(dict(state, job_id=job_id, updated_at=time.time()), handle, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        checkpoint = self.load(job_id)
+        if checkpoint is not None:
+            checkpoint.update(fields)
+            self.save(job_id, checkpoint)
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            try:
+                os.remove(self._path(job_id))
+            except (OSError, ValueError):
+                pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        checkpoints = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json"):
+                checkpoint = self.load(name[: -len(".json")])
+                if checkpoint is not None:
+                    checkpoints.append(checkpoint)
+        return sorted(checkpoints, key=lambda item: item.get("updated_at", 0))
@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from lead_store import website_domain
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    email TEXT,
+    social_links TEXT,
+    status TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_domains_last_used ON domains (last_used);
+"""
+
+# Statuses that mean the site itself answered; anything else (timeouts,
+# HTTP errors, non-HTML responses) is cached for the shorter negative TTL.
+POSITIVE_STATUSES = ("ok", "browser")
+
+
+class DomainCache:
+    """Persistent enrichment results keyed by normalized website domain.
+
+    Shared by every job (and thread): each thread gets its own SQLite
+    connection. Successful lookups live for ``ttl_seconds``, failures for
+    ``negative_ttl_seconds``, and once more than ``max_entries`` domains are
+    stored the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, negative_ttl_seconds: float, max_entries: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        row = connection.execute("SELECT * FROM domains WHERE domain = ?", (domain,)).fetchone()
+        now = time.time()
+        if row is not None:
+            ttl = self.ttl_seconds if row["status"] in POSITIVE_STATUSES else self.negative_ttl_seconds
+            if now - row["fetched_at"] > ttl:
+                row = None
+        if row is None:
+            self._count(False)
+            return None
+        with connection:
+            connection.execute("UPDATE domains SET last_used = ? WHERE domain = ?", (now, domain))
+        self._count(True)
+        return {
+            "email": row["email"],
+            "social_links": json.loads(row["social_links"]) if row["social_links"] else [],
+            "status": row["status"],
+            "bytes": 0,
+            "needs_browser": False,
+            "cached": True,
+        }
+
+    def put(self, domain: str, email: Optional[str], social_links: Any, status: str) -> None:
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO domains (domain, email, social_links, status, fetched_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (domain, email, json.dumps(social_links or [], ensure_ascii=False), status, now, now),
+            )
+            excess = connection.execute("SELECT COUNT(*) FROM domains").fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM domains WHERE domain IN (SELECT domain FROM domains ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                with self._lock:
+                    self.evictions += excess
+
+    def session(self) -> "DomainCacheSession":
+        return DomainCacheSession(self)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._connection().execute("SELECT COUNT(*) FROM domains").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+            "negative_ttl_seconds": self.negative_ttl_seconds,
+            "max_entries": self.max_entries,
+        }
+
+
+class DomainCacheSession:
+    """One job's view of a ``DomainCache``: takes URLs and counts its own lookups.
+
+    A hit is a website answered without a new fetch, either from the cache
+    or by sharing a fetch already in flight for the same domain; a miss is
+    a fetch.
+    """
+
+    def __init__(self, cache: DomainCache) -> None:
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    @staticmethod
+    def key(url: str) -> Optional[str]:
+        return website_domain(url)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        domain = self.key(url)
+        if not domain:
+            return None
+        result = self.cache.get(domain)
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def record_fetch(self) -> None:
+        self.misses += 1
+
+    def record_shared(self) -> None:
+        self.hits += 1
+        self.shared += 1
+
+    def put(self, url: str, result: Dict[str, Any]) -> None:
+        domain = self.key(url)
+        if domain and not result.get("needs_browser"):
+            self.cache.put(domain, result["email"], result["social_links"], result["status"])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_fetches": self.shared,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
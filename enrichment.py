@@ -0,0 +1,232 @@
+import asyncio
+import codecs
+import re
+import threading
+from concurrent.futures import Future, wait
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+SOCIAL_PATTERN = re.compile(
+    r"https?://(?:www\.)?(?:instagram\.com|facebook\.com|linkedin\.com)/[^\"\'\s>]+",
+    re.IGNORECASE,
+)
+# An empty SPA mount point or a <noscript> "enable JavaScript" notice.
+JS_SHELL_PATTERN = re.compile(
+    r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt)[\"'][^>]*>\s*</div>"
+    r"|<noscript[^>]*>[^<]*(?:enable|requires?|turn on)\s+javascript",
+    re.IGNORECASE,
+)
+MARKUP_PATTERN = re.compile(r"<script.*?</script>|<style.*?</style>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+
+ENRICH_MAX_BYTES = 512 * 1024
+ENRICH_MAX_CONNECTIONS = 32
+ENRICH_PER_HOST_LIMIT = 2
+ENRICH_TIMEOUT_SECONDS = 15.0
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+# Longest match we expect to straddle two chunks.
+SCAN_OVERLAP = 512
+JS_SAMPLE_CHARS = 64 * 1024
+JS_SHELL_MAX_WORDS = 150
+
+
+def _needs_javascript(html: str) -> bool:
+    if not JS_SHELL_PATTERN.search(html):
+        return False
+    return len(MARKUP_PATTERN.sub(" ", html).split()) < JS_SHELL_MAX_WORDS
+
+
+class PageScanner:
+    """Incremental email/social scan over a page delivered in chunks.
+
+    Each chunk is scanned together with the unscanned tail of the previous
+    one, so matches split across chunk boundaries are still found once.
+    """
+
+    def __init__(self) -> None:
+        self.email: Optional[str] = None
+        self.social_links: Dict[str, None] = {}
+        self.bytes_read = 0
+        self._pending = ""
+        self._sample: List[str] = []
+        self._sample_chars = 0
+
+    def feed(self, text: str, size: int) -> None:
+        self.bytes_read += size
+        if self._sample_chars < JS_SAMPLE_CHARS:
+            self._sample.append(text[: JS_SAMPLE_CHARS - self._sample_chars])
+            self._sample_chars += len(self._sample[-1])
+        window = self._pending + text
+        cut = max(0, len(window) - SCAN_OVERLAP)
+        self._scan(window, cut)
+        self._pending = window[cut:]
+
+    def finish(self) -> None:
+        self._scan(self._pending, len(self._pending))
+        self._pending = ""
+
+    def _scan(self, window: str, cut: int) -> None:
+        for match in SOCIAL_PATTERN.finditer(window):
+            if match.start() >= cut:
+                break
+            self.social_links.setdefault(match.group(0), None)
+        if self.email is None:
+            match = EMAIL_PATTERN.search(window)
+            if match and match.start() < cut:
+                self.email = match.group(0)
+
+    def result(self, status: str) -> Dict[str, Any]:
+        return {
+            "email": self.email,
+            "social_links": list(self.social_links),
+            "status": status,
+            "bytes": self.bytes_read,
+            "needs_browser": self.email is None and _needs_javascript("".join(self._sample)),
+        }
+
+
+def _empty_result(status: str) -> Dict[str, Any]:
+    return {"email": None, "social_links": [], "status": status, "bytes": 0, "needs_browser": False}
+
+
+class Enricher:
+    """Fetches lead websites over a keep-alive HTTP client on its own thread.
+
+    ``submit`` is safe to call from the scraper thread and returns
+    immediately; ``callback(result)`` runs on the enricher thread when the
+    fetch completes. A fetch stops reading as soon as an email is found or
+    ``max_bytes`` have been read. With a ``cache`` (a ``DomainCacheSession``),
+    known domains are answered from it and concurrent lookups for the same
+    domain share one fetch. With ``host_buckets`` (a ``pacing.HostBuckets``)
+    every request first waits for a token for its host, and 429/503
+    answers slow that host down.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = ENRICH_MAX_BYTES,
+        max_connections: int = ENRICH_MAX_CONNECTIONS,
+        per_host_limit: int = ENRICH_PER_HOST_LIMIT,
+        timeout: float = ENRICH_TIMEOUT_SECONDS,
+        cache=None,
+        host_buckets=None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.host_buckets = host_buckets
+        self.per_host_limit = per_host_limit
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(timeout)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="enricher", daemon=True)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Set[Future] = set()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open_client(), self._loop).result()
+
+    async def _open_client(self) -> None:
+        self._client = httpx.AsyncClient(
+            limits=self._limits,
+            timeout=self._timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+        )
+
+    def submit(self, url: str, callback: Callable[[Dict[str, Any]], None]) -> Future:
+        future = asyncio.run_coroutine_threadsafe(self._run(url, callback), self._loop)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    async def _run(self, url: str, callback: Callable[[Dict[str, Any]], None]) -> None:
+        # The callback must fire for every submitted URL, or the lead never
+        # gets its enrichment event.
+        try:
+            result = await self.lookup(url)
+        except Exception as exc:
+            result = _empty_result(f"error:{type(exc).__name__}")
+        callback(result)
+
+    async def lookup(self, url: str) -> Dict[str, Any]:
+        key = self.cache.key(url) if self.cache is not None else None
+        if not key:
+            return await self.fetch(url)
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._fetch_and_store(url))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.cache.record_fetch()
+        else:
+            self.cache.record_shared()
+        return await task
+
+    async def _fetch_and_store(self, url: str) -> Dict[str, Any]:
+        result = await self.fetch(url)
+        self.cache.put(url, result)
+        return result
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        semaphore = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            if self.host_buckets is not None:
+                await asyncio.sleep(self.host_buckets.reserve(host))
+            yield
+
+    async def fetch(self, url: str) -> Dict[str, Any]:
+        try:
+            host = (urlsplit(url).hostname or url).lower()
+            async with self._host_slot(host):
+                async with self._client.stream("GET", url) as response:
+                    if self.host_buckets is not None:
+                        if response.status_code in (429, 503):
+                            self.host_buckets.penalize(host)
+                        else:
+                            self.host_buckets.reward(host)
+                    if response.status_code >= 400:
+                        return _empty_result(f"http_{response.status_code}")
+                    content_type = response.headers.get("content-type", "")
+                    if content_type and "html" not in content_type and "text" not in content_type:
+                        return _empty_result("not_html")
+
+                    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                    scanner = PageScanner()
+                    async for chunk in response.aiter_bytes():
+                        scanner.feed(decoder.decode(chunk), len(chunk))
+                        if scanner.email or scanner.bytes_read >= self.max_bytes:
+                            break
+                    scanner.finish()
+                    return scanner.result("ok")
+        except (httpx.HTTPError, LookupError, ValueError) as exc:
+            return _empty_result(f"error:{type(exc).__name__}")
+
+    def close(self, wait_for_pending: bool = True) -> None:
+        pending = list(self._pending)
+        if wait_for_pending:
+            wait(pending)
+        else:
+            for future in pending:
+                future.cancel()
+
+        async def _shutdown() -> None:
+            if self._client is not None:
+                await self._client.aclose()
+            # Streams abandoned after an early email match leave suspended generators behind.
+            await self._loop.shutdown_asyncgens()
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
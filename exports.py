@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lead_store import LeadStore
+from protocol import LEAD_FIELDS
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = ["xlsx", "csv", "ndjson"]
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return value
+
+
+def _row(lead: Dict[str, Any]) -> List[Any]:
+    return [_cell(lead.get(field)) for field in LEAD_FIELDS]
+
+
+def iter_csv(store: LeadStore, job_id: str) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LEAD_FIELDS)
+    for batch in store.iter_job_leads(job_id, EXPORT_BATCH_SIZE):
+        writer.writerows(_row(lead) for lead in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(store: LeadStore, job_id: str) -> Iterator[str]:
+    for batch in store.iter_job_leads(job_id, EXPORT_BATCH_SIZE):
+        yield "".join(json.dumps(lead, ensure_ascii=False) + "\n" for lead in batch)
+
+
+class XlsxExporter:
+    """Builds XLSX exports on demand and keeps them until the job's leads change.
+
+    Workbooks are written in openpyxl's write-only mode, which streams rows
+    to disk instead of keeping the whole sheet in memory. ``build`` is
+    blocking; call it from a worker thread.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.builds = 0
+        self.hits = 0
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.xlsx")
+
+    def build(self, store: LeadStore, job_id: str) -> str:
+        with self._guard:
+            lock = self._locks.setdefault(job_id, threading.Lock())
+        with lock:
+            path = self.path(job_id)
+            version = store.job_version(job_id)
+            if self._versions.get(job_id) == version and os.path.exists(path):
+                self.hits += 1
+                return path
+            # openpyxl is slow to import and only needed here.
+            from openpyxl import Workbook
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Leads")
+            sheet.append(LEAD_FIELDS)
+            for batch in store.iter_job_leads(job_id, EXPORT_BATCH_SIZE):
+                for lead in batch:
+                    sheet.append(_row(lead))
+            tmp_path = f"{path}.tmp"
+            workbook.save(tmp_path)
+            os.replace(tmp_path, path)
+            self._versions[job_id] = version
+            self.builds += 1
+            return path
+
+
+def write_leads(leads: Iterable[Dict[str, Any]], path: str, fmt: Optional[str] = None) -> str:
+    """Write ``leads`` to ``path`` as one of ``EXPORT_FORMATS`` (by default its extension).
+
+    Blocking, like ``XlsxExporter.build``; the desktop app runs it on a
+    worker thread. The file is written beside ``path`` and moved into place.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+    tmp_path = f"{path}.tmp"
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Leads")
+        sheet.append(LEAD_FIELDS)
+        for lead in leads:
+            sheet.append(_row(lead))
+        workbook.save(tmp_path)
+    else:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+            if fmt == "csv":
+                writer = csv.writer(handle)
+                writer.writerow(LEAD_FIELDS)
+                writer.writerows(_row(lead) for lead in leads)
+            else:
+                handle.writelines(json.dumps(lead, ensure_ascii=False) + "\n" for lead in leads)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,249 @@
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+from protocol import BATCH_PROTOCOL, LEGACY_PROTOCOL, encode_event, encode_frame, hello_event
+
+ALL_JOBS = "*"
+PROGRESS_PREFIX = "__PROGRESS__:"
+# Messages a client can't reconstruct if dropped; everything else (progress,
+# plain log lines) may be merged or discarded for slow consumers.
+CRITICAL_PREFIXES = (
+    "__LEAD__:",
+    "__ENRICH__:",
+    "__SCRAPE_DONE__",
+    "__SUGGEST__:",
+    "__SUGGEST_LOCATION__:",
+    "__PONG__",
+    "__METRICS__:",
+)
+
+
+BATCH_INTERVAL_SECONDS = 0.05
+BATCH_MAX_EVENTS = 100
+
+
+class _Entry:
+    __slots__ = ("message", "job_id", "event")
+
+    def __init__(self, message: Optional[str], job_id: Optional[str], event: Optional[Dict[str, Any]]) -> None:
+        self.message = message
+        self.job_id = job_id
+        self.event = event
+
+    @property
+    def critical(self) -> bool:
+        return self.message is None or self.message.startswith(CRITICAL_PREFIXES)
+
+
+class Subscriber:
+    """One WebSocket client with a bounded outgoing queue.
+
+    ``offer`` never blocks: progress updates for a job replace the one still
+    waiting in the queue, and when the queue is full the oldest non-critical
+    message is dropped. A client that falls ``max_queue * 4`` critical
+    messages behind is disconnected. Protocol-2 clients get the queue flushed
+    as one frame every ``BATCH_INTERVAL_SECONDS`` or ``BATCH_MAX_EVENTS``.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int, protocol: int = LEGACY_PROTOCOL) -> None:
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.protocol = protocol
+        self.jobs: Set[str] = set()
+        self.dropped = 0
+        self.merged = 0
+        self.sent = 0
+        self.frames = 0
+        self.closed = False
+        self._queue: Deque[_Entry] = deque()
+        self._pending_progress: Dict[Optional[str], _Entry] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._sender())
+
+    def wants(self, job_id: Optional[str]) -> bool:
+        return ALL_JOBS in self.jobs or job_id in self.jobs
+
+    def set_protocol(self, protocol: int) -> None:
+        self.protocol = protocol
+        if protocol == BATCH_PROTOCOL:
+            self._enqueue(_Entry(None, None, hello_event()))
+
+    def offer(self, message: str, job_id: Optional[str] = None, event: Optional[Dict[str, Any]] = None) -> None:
+        if self.closed:
+            return
+        if self.protocol == BATCH_PROTOCOL and event is None:
+            event = encode_event(message, job_id)
+        if message.startswith(PROGRESS_PREFIX):
+            entry = self._pending_progress.get(job_id)
+            if entry is not None:
+                entry.message = message
+                entry.event = event
+                self.merged += 1
+                return
+            entry = _Entry(message, job_id, event)
+            self._pending_progress[job_id] = entry
+        else:
+            entry = _Entry(message, job_id, event)
+        self._enqueue(entry)
+
+    def _enqueue(self, entry: _Entry) -> None:
+        if len(self._queue) >= self.max_queue and not self._drop_oldest_noncritical():
+            if len(self._queue) >= self.max_queue * 4:
+                self.close()
+                asyncio.get_running_loop().create_task(self._close_socket())
+                return
+        self._queue.append(entry)
+        self._ready.set()
+
+    def _drop_oldest_noncritical(self) -> bool:
+        for entry in self._queue:
+            if not entry.critical:
+                self._queue.remove(entry)
+                self._forget_progress(entry)
+                self.dropped += 1
+                return True
+        return False
+
+    def _forget_progress(self, entry: _Entry) -> None:
+        if self._pending_progress.get(entry.job_id) is entry:
+            del self._pending_progress[entry.job_id]
+
+    def _pop(self) -> _Entry:
+        entry = self._queue.popleft()
+        self._forget_progress(entry)
+        return entry
+
+    async def _sender(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                if self.protocol == BATCH_PROTOCOL:
+                    await self._send_batch()
+                else:
+                    await self.websocket.send_text(self._pop().message)
+                    self.sent += 1
+                    self.frames += 1
+        except Exception:
+            self.closed = True
+
+    async def _send_batch(self) -> None:
+        if len(self._queue) < BATCH_MAX_EVENTS:
+            # Let a burst of scraper messages accumulate into one frame.
+            await asyncio.sleep(BATCH_INTERVAL_SECONDS)
+        events = []
+        while self._queue and len(events) < BATCH_MAX_EVENTS:
+            entry = self._pop()
+            events.append(entry.event if entry.event is not None else encode_event(entry.message, entry.job_id))
+        if events:
+            await self.websocket.send_text(encode_frame(events))
+            self.sent += len(events)
+            self.frames += 1
+
+    def close(self) -> None:
+        self.closed = True
+        self._queue.clear()
+        self._pending_progress.clear()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _close_socket(self) -> None:
+        try:
+            await self.websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": sorted(self.jobs),
+            "queued": len(self._queue),
+            "protocol": self.protocol,
+            "sent": self.sent,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "merged": self.merged,
+        }
+
+
+class PubSubHub:
+    """Fans job messages out to every WebSocket subscribed to that job."""
+
+    def __init__(self, max_queue: int = 256) -> None:
+        self.max_queue = max_queue
+        self.subscribers: Dict[WebSocket, Subscriber] = {}
+        # In-process consumers of a job's messages (e.g. bulk batches), called on publish.
+        self.listeners: Dict[str, List[Callable[[str], None]]] = {}
+
+    async def connect(self, websocket: WebSocket, protocol: int = LEGACY_PROTOCOL) -> Subscriber:
+        await websocket.accept()
+        subscriber = Subscriber(websocket, self.max_queue)
+        subscriber.set_protocol(protocol)
+        subscriber.start()
+        self.subscribers[websocket] = subscriber
+        return subscriber
+
+    def set_protocol(self, websocket: WebSocket, protocol: int) -> None:
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is not None:
+            subscriber.set_protocol(protocol)
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.close()
+
+    def subscribe(self, websocket: WebSocket, job_id: str) -> None:
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is not None:
+            subscriber.jobs.add(job_id)
+
+    def unsubscribe(self, websocket: WebSocket, job_id: str) -> None:
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is not None:
+            subscriber.jobs.discard(job_id)
+
+    def listen(self, job_id: str, callback: Callable[[str], None]) -> None:
+        self.listeners.setdefault(job_id, []).append(callback)
+
+    def unlisten(self, job_id: str, callback: Callable[[str], None]) -> None:
+        callbacks = self.listeners.get(job_id, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.listeners.pop(job_id, None)
+
+    def publish(self, job_id: str, message: str) -> None:
+        for callback in list(self.listeners.get(job_id, ())):
+            callback(message)
+        event = None
+        for websocket, subscriber in list(self.subscribers.items()):
+            if subscriber.closed:
+                self.disconnect(websocket)
+            elif subscriber.wants(job_id):
+                if subscriber.protocol == BATCH_PROTOCOL and event is None:
+                    # Encode once, not once per batched subscriber.
+                    event = encode_event(message, job_id)
+                subscriber.offer(message, job_id, event)
+
+    def send(self, websocket: WebSocket, message: str) -> None:
+        subscriber = self.subscribers.get(websocket)
+        if subscriber is not None:
+            subscriber.offer(message)
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = list(self.subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "dropped": sum(item.dropped for item in subscribers),
+            "merged": sum(item.merged for item in subscribers),
+            "frames": sum(item.frames for item in subscribers),
+            "batched_subscribers": sum(1 for item in subscribers if item.protocol == BATCH_PROTOCOL),
+        }
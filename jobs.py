@@ -0,0 +1,199 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+# Job ids are the first 12 hex digits of a uuid4; ids from clients must match.
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{12}")
+
+
+@dataclass
+class Job:
+    keyword: str
+    location: str
+    deep_search: bool = False
+    max_parallel_tabs: int = 1
+    resource_policy: Optional[str] = None
+    priority: int = 0
+    max_results: int = 100
+    force_refresh: bool = False
+    profile: bool = False
+    areas: Optional[List[str]] = None
+    grid: Optional[Dict[str, Any]] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    lead_count: int = 0
+    error: Optional[str] = None
+    cached: bool = False
+    resumed: bool = False
+    metrics: Optional[Dict[str, Any]] = None
+    profile_url: Optional[str] = None
+    user_cancelled: bool = False
+    enrichment_cache: Optional[Dict[str, Any]] = None
+    stop_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "keyword": self.keyword,
+            "location": self.location,
+            "deep_search": self.deep_search,
+            "max_parallel_tabs": self.max_parallel_tabs,
+            "resource_policy": self.resource_policy,
+            "priority": self.priority,
+            "max_results": self.max_results,
+            "force_refresh": self.force_refresh,
+            "profile": self.profile,
+            "profile_url": self.profile_url,
+            "areas": self.areas,
+            "grid": self.grid,
+            "cached": self.cached,
+            "resumed": self.resumed,
+            "enrichment_cache": self.enrichment_cache,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "lead_count": self.lead_count,
+            "error": self.error,
+            "metrics": self.metrics,
+        }
+
+
+class JobScheduler:
+    """Runs scrape jobs from a priority queue on a fixed number of workers.
+
+    Higher ``priority`` runs first; equal priorities run in submission
+    order. ``runner(job)`` does the actual scrape and returns its leads;
+    ``on_finish(job)``, if given, is called once a job that ran has its final status.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Job], Awaitable[List[Dict[str, Any]]]],
+        workers: int = 1,
+        history_limit: int = 200,
+        on_finish: Optional[Callable[[Job], None]] = None,
+    ) -> None:
+        self.runner = runner
+        self.on_finish = on_finish
+        self.workers = max(1, workers)
+        self.history_limit = history_limit
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for job in self.jobs.values():
+            job.stop_event.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: Job) -> Job:
+        if self._queue is None:
+            raise RuntimeError("Job scheduler is not started.")
+        self.jobs[job.id] = job
+        self._queue.put_nowait((-job.priority, next(self._sequence), job.id))
+        self._trim_history()
+        return job
+
+    async def wait(self, job: Job) -> Job:
+        """Wait until ``job`` has its final status."""
+        if not job.finished:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(job.id, []).append(future)
+            await future
+        return job
+
+    def _notify(self, job: Job) -> None:
+        for future in self._waiters.pop(job.id, []):
+            if not future.done():
+                future.set_result(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def queue_position(self, job: Job) -> int:
+        queued = [item for item in self.jobs.values() if item.status == QUEUED]
+        queued.sort(key=lambda item: (-item.priority, item.created_at))
+        return queued.index(job) + 1 if job in queued else 0
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.user_cancelled = True
+        job.stop_event.set()
+        if job.status == QUEUED:
+            # The worker drops it when it reaches the head of the queue.
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._notify(job)
+        return job
+
+    def latest_finished(self) -> Optional[Job]:
+        """Most recent job that ran to completion or was stopped mid-run (both have results)."""
+        done = [
+            job
+            for job in self.jobs.values()
+            if job.status in (COMPLETED, CANCELLED) and job.started_at is not None
+        ]
+        return max(done, key=lambda job: job.finished_at or 0, default=None)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                leads = await self.runner(job)
+                job.lead_count = len(leads)
+                job.status = CANCELLED if job.stop_event.is_set() else COMPLETED
+            except asyncio.CancelledError:
+                job.status = CANCELLED
+                raise
+            except Exception as exc:
+                job.status = FAILED
+                job.error = str(exc)
+            finally:
+                job.finished_at = time.time()
+                if self.on_finish is not None:
+                    self.on_finish(job)
+                self._notify(job)
+
+    def _trim_history(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished]
+        excess = len(self.jobs) - self.history_limit
+        for job in sorted(finished, key=lambda item: item.finished_at or 0)[:max(0, excess)]:
+            del self.jobs[job.id]
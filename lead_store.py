@@ -0,0 +1,335 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+NON_DIGITS = re.compile(r"[^0-9]+")
+WHITESPACE = re.compile(r"\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    location TEXT NOT NULL,
+    location_norm TEXT NOT NULL,
+    keyword TEXT,
+    phone TEXT,
+    phone_norm TEXT,
+    website TEXT,
+    domain TEXT,
+    rating REAL,
+    review_count INTEGER,
+    email TEXT,
+    social_links TEXT,
+    first_job_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_name_location ON leads (name_norm, location_norm);
+CREATE INDEX IF NOT EXISTS idx_leads_phone ON leads (phone_norm);
+CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads (domain);
+CREATE INDEX IF NOT EXISTS idx_leads_keyword ON leads (keyword COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_leads_rating ON leads (rating);
+
+CREATE TABLE IF NOT EXISTS lead_jobs (
+    lead_id INTEGER NOT NULL REFERENCES leads (id),
+    job_id TEXT NOT NULL,
+    PRIMARY KEY (job_id, lead_id)
+);
+CREATE INDEX IF NOT EXISTS idx_lead_jobs_lead ON lead_jobs (lead_id);
+-- Index entries carry the rowid, so this orders each job's links by capture order.
+CREATE INDEX IF NOT EXISTS idx_lead_jobs_job ON lead_jobs (job_id);
+
+-- One row per finished (not failed) job, whether or not its leads were new.
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_id TEXT PRIMARY KEY,
+    keyword TEXT NOT NULL,
+    location TEXT NOT NULL,
+    location_norm TEXT NOT NULL,
+    leads INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+"""
+
+# Seeds job_runs for databases created before it existed, from the jobs that
+# first stored each lead (the only per-job record those databases have).
+BACKFILL_JOB_RUNS = """
+INSERT OR IGNORE INTO job_runs (job_id, keyword, location, location_norm, leads, finished_at)
+SELECT first_job_id, MIN(keyword), MIN(location), MIN(location_norm), COUNT(*), MAX(created_at) FROM leads
+WHERE first_job_id IS NOT NULL AND keyword IS NOT NULL GROUP BY first_job_id
+"""
+
+# Column -> export field name used by the scraper and the UI.
+LEAD_COLUMNS = [
+    ("name", "Name"),
+    ("phone", "Phone"),
+    ("website", "Website"),
+    ("rating", "Rating"),
+    ("review_count", "Review Count"),
+    ("social_links", "Social Links"),
+    ("email", "Email"),
+]
+
+
+def normalize_text(value: Optional[str]) -> str:
+    return WHITESPACE.sub(" ", value or "").strip().lower()
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    if not phone:
+        return None
+    digits = NON_DIGITS.sub("", phone)
+    return digits or None
+
+
+def website_domain(website: Optional[str]) -> Optional[str]:
+    if not website:
+        return None
+    host = urlsplit(website if "//" in website else f"//{website}").hostname
+    if not host:
+        return None
+    return host[4:] if host.startswith("www.") else host
+
+
+def lead_keys(lead: Dict[str, Any]) -> List[str]:
+    """Identity keys for merging leads in memory; two leads that share any key are one business.
+
+    Mirrors ``LeadStore``'s rule without the location (callers merge leads
+    from one search): phone + name and phone + website domain when there
+    is a phone, else name + domain.
+    """
+    return identity_keys(
+        normalize_text(lead.get("Name")), normalize_phone(lead.get("Phone")), website_domain(lead.get("Website"))
+    )
+
+
+def identity_keys(name_norm: str, phone_norm: Optional[str], domain: Optional[str]) -> List[str]:
+    """``lead_keys`` for a lead whose name, phone and domain are already normalized."""
+    if not phone_norm:
+        return [f"{name_norm}|{domain or ''}"]
+    keys = [f"tel:{phone_norm}|{name_norm}"]
+    if domain:
+        keys.append(f"tel:{phone_norm}|@{domain}")
+    return keys
+
+
+def _row_to_lead(row: sqlite3.Row) -> Dict[str, Any]:
+    lead = {field: row[column] for column, field in LEAD_COLUMNS}
+    lead["Social Links"] = json.loads(row["social_links"]) if row["social_links"] else None
+    return lead
+
+
+class LeadStore:
+    """Persistent, deduplicated lead table in SQLite (WAL mode).
+
+    Safe to use from several threads: each thread gets its own connection.
+    Two leads are the same business when their normalized phones match and
+    so does their name or website domain (franchises and shared
+    switchboards put one number on several businesses), or, for leads
+    without a phone, when name, location and website domain match (chains
+    share a name within a city, so name + location alone is not enough).
+    Upserts fill in missing fields and merge enrichment into the existing
+    row.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            backfill = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_runs'"
+            ).fetchone() is None
+            connection.executescript(SCHEMA)
+            if backfill:
+                connection.execute(BACKFILL_JOB_RUNS)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _find(
+        self,
+        connection: sqlite3.Connection,
+        name_norm: str,
+        location_norm: str,
+        phone_norm: Optional[str],
+        domain: Optional[str],
+    ) -> Optional[int]:
+        if phone_norm:
+            row = connection.execute(
+                "SELECT id FROM leads WHERE phone_norm = ? AND (name_norm = ? OR (? IS NOT NULL AND domain = ?)) "
+                "LIMIT 1",
+                (phone_norm, name_norm, domain, domain),
+            ).fetchone()
+        else:
+            row = connection.execute(
+                "SELECT id FROM leads WHERE name_norm = ? AND location_norm = ? AND domain IS ? LIMIT 1",
+                (name_norm, location_norm, domain),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def upsert(self, lead: Dict[str, Any], job_id: str, keyword: str, location: str) -> int:
+        return self.upsert_many([lead], job_id, keyword, location)[0]
+
+    def upsert_many(self, leads: Iterable[Dict[str, Any]], job_id: str, keyword: str, location: str) -> List[int]:
+        connection = self._connection()
+        now = time.time()
+        location_norm = normalize_text(location)
+        ids = []
+        with connection:
+            for lead in leads:
+                name_norm = normalize_text(lead.get("Name"))
+                phone_norm = normalize_phone(lead.get("Phone"))
+                domain = website_domain(lead.get("Website"))
+                socials = lead.get("Social Links")
+                values = (
+                    lead.get("Phone"),
+                    phone_norm,
+                    lead.get("Website"),
+                    domain,
+                    lead.get("Rating"),
+                    lead.get("Review Count"),
+                    lead.get("Email"),
+                    json.dumps(socials, ensure_ascii=False) if socials else None,
+                )
+                lead_id = self._find(connection, name_norm, location_norm, phone_norm, domain)
+                if lead_id is None:
+                    cursor = connection.execute(
+                        "INSERT INTO leads (phone, phone_norm, website, domain, rating, review_count, email, "
+                        "social_links, name, name_norm, location, location_norm, keyword, first_job_id, "
+                        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        values + (lead.get("Name"), name_norm, location, location_norm, keyword, job_id, now, now),
+                    )
+                    lead_id = cursor.lastrowid
+                else:
+                    connection.execute(
+                        "UPDATE leads SET phone = COALESCE(?, phone), phone_norm = COALESCE(?, phone_norm), "
+                        "website = COALESCE(?, website), domain = COALESCE(?, domain), "
+                        "rating = COALESCE(?, rating), review_count = COALESCE(?, review_count), "
+                        "email = COALESCE(?, email), social_links = COALESCE(?, social_links), "
+                        "updated_at = ? WHERE id = ?",
+                        values + (now, lead_id),
+                    )
+                connection.execute(
+                    "INSERT OR IGNORE INTO lead_jobs (lead_id, job_id) VALUES (?, ?)",
+                    (lead_id, job_id),
+                )
+                ids.append(lead_id)
+        return ids
+
+    def _filters(
+        self,
+        job_id: Optional[str],
+        keyword: Optional[str],
+        min_rating: Optional[float],
+        max_rating: Optional[float],
+        has_email: Optional[bool],
+    ) -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        if job_id:
+            clauses.append("leads.id IN (SELECT lead_id FROM lead_jobs WHERE job_id = ?)")
+            params.append(job_id)
+        if keyword:
+            clauses.append("leads.keyword = ? COLLATE NOCASE")
+            params.append(keyword.strip())
+        if min_rating is not None:
+            clauses.append("leads.rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append("leads.rating <= ?")
+            params.append(max_rating)
+        if has_email is not None:
+            clauses.append("leads.email IS NOT NULL" if has_email else "leads.email IS NULL")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(
+        self,
+        job_id: Optional[str] = None,
+        keyword: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        has_email: Optional[bool] = None,
+        page: int = 1,
+        page_size: int = 50,
+    ) -> Dict[str, Any]:
+        where, params = self._filters(job_id, keyword, min_rating, max_rating, has_email)
+        connection = self._connection()
+        total = connection.execute(f"SELECT COUNT(*) FROM leads{where}", params).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT * FROM leads{where} ORDER BY leads.id LIMIT ? OFFSET ?",
+            params + [page_size, (page - 1) * page_size],
+        ).fetchall()
+        items = []
+        for row in rows:
+            item = _row_to_lead(row)
+            item.update({
+                "id": row["id"],
+                "keyword": row["keyword"],
+                "location": row["location"],
+                "domain": row["domain"],
+                "updated_at": row["updated_at"],
+            })
+            items.append(item)
+        return {"items": items, "total": total, "page": page, "page_size": page_size}
+
+    def iter_job_leads(self, job_id: str, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a job's leads in capture order, ``batch_size`` rows at a time.
+
+        Each batch is a separate keyset query on the calling thread's
+        connection, so the generator may be advanced from different threads
+        (as Starlette does for sync streaming bodies) and never holds more
+        than one batch in memory.
+        """
+        last_rowid = 0
+        while True:
+            rows = self._connection().execute(
+                "SELECT lead_jobs.rowid AS link_rowid, leads.* FROM lead_jobs "
+                "JOIN leads ON leads.id = lead_jobs.lead_id "
+                "WHERE lead_jobs.job_id = ? AND lead_jobs.rowid > ? ORDER BY lead_jobs.rowid LIMIT ?",
+                (job_id, last_rowid, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1]["link_rowid"]
+            yield [_row_to_lead(row) for row in rows]
+
+    def record_run(self, job_id: str, keyword: str, location: str, leads: int) -> None:
+        """Record a finished job for ``query_history``; a resumed job replaces its earlier row."""
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO job_runs (job_id, keyword, location, location_norm, leads, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, keyword, location, normalize_text(location), leads, time.time()),
+            )
+
+    def query_history(self) -> List[Tuple[str, str, int, int]]:
+        """(keyword, location, jobs, leads) for every search recorded with ``record_run``.
+
+        Every finished job counts, including repeat runs whose leads were
+        all known already, with the leads it found.
+        """
+        rows = self._connection().execute(
+            "SELECT MIN(keyword), MIN(location), COUNT(*), SUM(leads) FROM job_runs "
+            "GROUP BY keyword COLLATE NOCASE, location_norm"
+        ).fetchall()
+        return [(row[0], row[1], row[2], row[3]) for row in rows]
+
+    def job_version(self, job_id: str) -> Tuple[int, float]:
+        """(lead count, latest update) for a job; changes whenever its results do."""
+        row = self._connection().execute(
+            "SELECT COUNT(*), MAX(leads.updated_at) FROM lead_jobs "
+            "JOIN leads ON leads.id = lead_jobs.lead_id WHERE lead_jobs.job_id = ?",
+            (job_id,),
+        ).fetchone()
+        return row[0], row[1] or 0.0
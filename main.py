@@ -1,23 +1,121 @@
 import customtkinter as ctk
+import queue
 import threading
 import time
-import pandas as pd
-from tkinter import filedialog, messagebox
-from scraper import scrape_google_maps
+from tkinter import filedialog, messagebox, ttk
+
+from exports import EXPORT_FORMATS, write_leads
+from protocol import LEAD_FIELDS
+from scraper import ENRICH, LEAD, iter_scrape_google_maps
 
 # Set the modern theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# The worker threads only ever touch `events`; the Tk loop drains it every
+# DRAIN_INTERVAL_MS, at most DRAIN_MAX_EVENTS at a time, and redraws once
+# per batch. A full queue makes the scraper wait instead of growing memory.
+EVENT_QUEUE_SIZE = 5000
+DRAIN_INTERVAL_MS = 100
+DRAIN_MAX_EVENTS = 1000
+LOG_MAX_LINES = 500
+TABLE_ROWS = 15
+WHEEL_ROWS = 3
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return value
+
+
+class LeadTable(ctk.CTkFrame):
+    """Live results table that only ever holds ``rows`` Treeview items.
+
+    Leads stay in a plain list; scrolling moves a window over it and
+    rewrites those few items, so 10k leads cost no more to draw than 15.
+    While scrolled to the bottom the window follows new leads.
+    """
+
+    def __init__(self, master, rows=TABLE_ROWS):
+        super().__init__(master)
+        self.leads = []
+        self.rows = rows
+        self.offset = 0
+        self.follow = True
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self, columns=LEAD_FIELDS, show="headings", height=rows, selectmode="none")
+        for field in LEAD_FIELDS:
+            self.tree.heading(field, text=field)
+            self.tree.column(field, width=110, stretch=True)
+        for index in range(rows):
+            self.tree.insert("", "end", iid=str(index), values=[""] * len(LEAD_FIELDS))
+        self.tree.grid(row=0, column=0, sticky="nsew")
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+
+    def add(self, leads):
+        self.leads.extend(leads)
+        if self.follow:
+            self.offset = max(0, len(self.leads) - self.rows)
+
+    def clear(self):
+        self.leads = []
+        self.offset = 0
+        self.follow = True
+        self.refresh()
+
+    def refresh(self):
+        for index in range(self.rows):
+            position = self.offset + index
+            if position < len(self.leads):
+                lead = self.leads[position]
+                values = [_cell(lead.get(field)) for field in LEAD_FIELDS]
+            else:
+                values = [""] * len(LEAD_FIELDS)
+            self.tree.item(str(index), values=values)
+        total = max(len(self.leads), 1)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+
+    def _scroll_to(self, offset):
+        last = max(0, len(self.leads) - self.rows)
+        self.offset = max(0, min(int(offset), last))
+        self.follow = self.offset >= last
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(value) * len(self.leads))
+        elif action == "scroll":
+            self._scroll_to(self.offset + int(value) * (self.rows if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self.offset + (-WHEEL_ROWS if up else WHEEL_ROWS))
+
+
 class LeadScraperApp(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         self.title("AI Lead Scraper Pro - Portfolio Project")
-        self.geometry("700x500")
+        self.geometry("960x720")
+
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.stop_event = threading.Event()
+        self.emails = 0
+        self.progress = ""
+        self.log_lines = 0
 
         # --- UI LAYOUT ---
         self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(4, weight=1)
 
         # Title Label
         self.label = ctk.CTkLabel(self, text="Google Maps Lead Scraper", font=("Helvetica", 24, "bold"))
@@ -33,20 +131,96 @@ class LeadScraperApp(ctk.CTk):
         self.location_entry = ctk.CTkEntry(self.input_frame, placeholder_text="Location (e.g. New York)", width=250)
         self.location_entry.grid(row=0, column=1, padx=10, pady=10)
 
-        # Start/Stop Buttons
-        self.start_btn = ctk.CTkButton(self, text="Start Extraction", command=self.start_scraping_thread)
-        self.start_btn.grid(row=2, column=0, padx=20, pady=10)
+        self.format_menu = ctk.CTkOptionMenu(self.input_frame, values=EXPORT_FORMATS, width=100)
+        self.format_menu.grid(row=0, column=2, padx=10, pady=10)
 
-        # Log Window (Shows real-time progress)
-        self.log_box = ctk.CTkTextbox(self, height=200, width=600)
-        self.log_box.grid(row=3, column=0, padx=20, pady=10)
-        self.log_box.insert("0.0", "System Ready...\n")
+        # Start/Stop/Export Buttons
+        self.button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.button_frame.grid(row=2, column=0, padx=20, pady=10)
+
+        self.start_btn = ctk.CTkButton(self.button_frame, text="Start Extraction", command=self.start_scraping_thread)
+        self.start_btn.grid(row=0, column=0, padx=10)
+
+        self.stop_btn = ctk.CTkButton(self.button_frame, text="Stop", command=self.stop_event.set, state="disabled")
+        self.stop_btn.grid(row=0, column=1, padx=10)
+
+        self.export_btn = ctk.CTkButton(self.button_frame, text="Export...", command=self.export_as)
+        self.export_btn.grid(row=0, column=2, padx=10)
+
+        self.status_label = ctk.CTkLabel(self, text="0 leads")
+        self.status_label.grid(row=3, column=0, padx=20, sticky="w")
+
+        # Live results
+        self.table = LeadTable(self)
+        self.table.grid(row=4, column=0, padx=20, pady=10, sticky="nsew")
+
+        # Log Window (Shows real-time progress, newest LOG_MAX_LINES lines)
+        self.log_box = ctk.CTkTextbox(self, height=160)
+        self.log_box.grid(row=5, column=0, padx=20, pady=10, sticky="ew")
+        self._write_log(["System Ready..."])
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(DRAIN_INTERVAL_MS, self._drain_events)
 
     def log(self, message):
-        """Update the UI log safely."""
-        self.log_box.insert("end", f"[{time.strftime('%H:%M:%S')}] {message}\n")
+        """Queue a log line; safe to call from any thread."""
+        if message.startswith("__PROGRESS__:"):
+            self.events.put(("progress", message[len("__PROGRESS__:"):]))
+        else:
+            self.events.put(("log", f"[{time.strftime('%H:%M:%S')}] {message}"))
+
+    def _write_log(self, lines):
+        text = "\n".join(lines) + "\n"
+        self.log_box.insert("end", text)
+        # Messages such as Playwright errors span several lines; the cap is
+        # on lines in the box, which is what the delete below counts.
+        self.log_lines += text.count("\n")
+        if self.log_lines > LOG_MAX_LINES:
+            excess = self.log_lines - LOG_MAX_LINES
+            self.log_box.delete("1.0", f"{excess + 1}.0")
+            self.log_lines = LOG_MAX_LINES
         self.log_box.see("end")
 
+    def _drain_events(self):
+        """Apply queued worker events in one batch, then reschedule."""
+        lines, leads, redraw, finished = [], [], False, None
+        for _ in range(DRAIN_MAX_EVENTS):
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                lines.append(payload)
+            elif kind == "progress":
+                self.progress = payload
+                redraw = True
+            elif kind == LEAD:
+                leads.append(payload)
+            elif kind == ENRICH:
+                # The lead dict is already updated in place; just redraw.
+                redraw = True
+                if payload.get("Email"):
+                    self.emails += 1
+            elif kind == "done":
+                finished = payload
+            elif kind == "exported":
+                lines.append(f"Exported {payload}")
+                self.export_btn.configure(state="normal")
+                messagebox.showinfo("Success", f"Leads exported to '{payload}'")
+            elif kind == "export_failed":
+                lines.append(f"Export failed: {payload}")
+                self.export_btn.configure(state="normal")
+
+        if lines:
+            self._write_log(lines[-LOG_MAX_LINES:])
+        if leads or redraw:
+            self.table.add(leads)
+            self.table.refresh()
+            self.status_label.configure(text=f"{len(self.table.leads)} leads, {self.emails} emails  {self.progress}")
+        if finished is not None:
+            self._finish(*finished)
+        self.after(DRAIN_INTERVAL_MS, self._drain_events)
+
     def start_scraping_thread(self):
         """Starts the scraper in a separate thread to keep UI responsive."""
         query = self.query_entry.get()
@@ -57,30 +231,68 @@ class LeadScraperApp(ctk.CTk):
             return
 
         self.start_btn.configure(state="disabled")
+        self.stop_btn.configure(state="normal")
+        self.stop_event.clear()
+        self.emails = 0
+        self.progress = ""
+        self.table.clear()
         # Start the background task
         threading.Thread(target=self.run_scraper_logic, args=(query, location), daemon=True).start()
 
     def run_scraper_logic(self, query, location):
-        """The actual scraping logic goes here."""
+        """Runs on the worker thread; everything it shows goes through `events`."""
+        error = None
         try:
             self.log(f"Initializing Browser for {query} in {location}...")
+            for event in iter_scrape_google_maps(query, location, self.log, stop_event=self.stop_event):
+                self.events.put(event)
+        except Exception as e:
+            error = str(e)
+        self.events.put(("done", (error,)))
 
-            leads = scrape_google_maps(query, location, self.log)
+    def _finish(self, error):
+        self.start_btn.configure(state="normal")
+        self.stop_btn.configure(state="disabled")
+        if error:
+            self._write_log([f"Error: {error}"])
+            return
+        if not self.table.leads:
+            self._write_log(["No leads found."])
+            return
+        self._write_log(["Scraping Complete!"])
+        self.export(f"leads_output.{self.format_menu.get()}")
 
-            if not leads:
-                self.log("No leads found.")
+    def export_as(self):
+        fmt = self.format_menu.get()
+        path = filedialog.asksaveasfilename(
+            defaultextension=f".{fmt}", initialfile=f"leads_output.{fmt}", filetypes=[(fmt.upper(), f"*.{fmt}")]
+        )
+        if path:
+            self.export(path)
 
-            self.log("Saving results to Excel...")
-            df = pd.DataFrame(leads)
-            df.to_excel("leads_output.xlsx", index=False)
-            self.log("Scraping Complete!")
-            messagebox.showinfo("Success", "Leads exported to 'leads_output.xlsx'")
-            
-        except Exception as e:
-            self.log(f"Error: {str(e)}")
-        finally:
-            self.start_btn.configure(state="normal")
+    def export(self, path):
+        """Write the current leads to `path` on a background thread."""
+        if not self.table.leads:
+            messagebox.showinfo("Export", "There are no leads to export yet.")
+            return
+        self.export_btn.configure(state="disabled")
+        self._write_log([f"Saving {len(self.table.leads)} leads to {path}..."])
+        # Snapshot on the Tk thread; the scraper may still be enriching these dicts.
+        snapshot = [dict(lead) for lead in self.table.leads]
+        fmt = self.format_menu.get()
+
+        def run():
+            try:
+                self.events.put(("exported", write_leads(snapshot, path, fmt)))
+            except Exception as e:
+                self.events.put(("export_failed", str(e)))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def on_close(self):
+        self.stop_event.set()
+        self.destroy()
 
 if __name__ == "__main__":
     app = LeadScraperApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
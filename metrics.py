@@ -0,0 +1,151 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Prometheus histogram bucket upper bounds, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+MAX_SAMPLES_PER_PHASE = 5000
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JobMetrics:
+    """Timing spans and counters for one job.
+
+    ``span`` and ``count`` may be called from any thread (scraper, enricher,
+    event loop). Each phase keeps its raw durations, capped at
+    ``MAX_SAMPLES_PER_PHASE``, for the percentiles in ``summary``; every
+    observation is also forwarded to ``registry`` when one is given.
+    """
+
+    def __init__(self, registry: Optional["MetricsRegistry"] = None) -> None:
+        self.registry = registry
+        self.started = time.monotonic()
+        self.phases: Dict[str, List[float]] = {}
+        self.totals: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            samples = self.phases.setdefault(phase, [])
+            if len(samples) < MAX_SAMPLES_PER_PHASE:
+                samples.append(seconds)
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+            self.counters[f"{phase}_count"] = self.counters.get(f"{phase}_count", 0) + 1
+        if self.registry is not None:
+            self.registry.observe(phase, seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.registry is not None:
+            self.registry.count(name, value)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            phases = {
+                phase: {
+                    "count": int(self.counters[f"{phase}_count"]),
+                    "total_ms": round(self.totals[phase] * 1000, 1),
+                    "p50_ms": round(_percentile(samples, 0.5) * 1000, 1),
+                    "p95_ms": round(_percentile(samples, 0.95) * 1000, 1),
+                    "max_ms": round(max(samples) * 1000, 1),
+                }
+                for phase, samples in self.phases.items()
+                if samples
+            }
+            counters = {name: value for name, value in self.counters.items() if not name.endswith("_count")}
+        leads = counters.get("leads", 0)
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "leads_per_minute": round(leads / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "phases": phases,
+            "counters": counters,
+        }
+
+
+class NullMetrics:
+    """Stand-in used when the caller doesn't collect metrics."""
+
+    @contextmanager
+    def span(self, phase: str):
+        yield
+
+    def observe(self, phase: str, seconds: float) -> None:
+        pass
+
+    def count(self, name: str, value: float = 1) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsRegistry:
+    """Process-wide aggregates rendered in the Prometheus text format."""
+
+    def __init__(self, prefix: str = "leadbot") -> None:
+        self.prefix = prefix
+        self._histograms: Dict[str, List[float]] = {}
+        self._counters: Dict[str, float] = {}
+        self._jobs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            # Per bucket counts, an overflow slot, then the running sum and total count.
+            histogram = self._histograms.setdefault(phase, [0.0] * (len(BUCKETS) + 3))
+            histogram[bisect_left(BUCKETS, seconds)] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_job(self, status: str) -> None:
+        with self._lock:
+            self._jobs[status] = self._jobs.get(status, 0) + 1
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition; ``gauges`` adds point-in-time values (name -> value)."""
+        lines = []
+        for gauge, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE {self.prefix}_{gauge} gauge", f"{self.prefix}_{gauge} {value:g}"]
+        name = f"{self.prefix}_phase_seconds"
+        lines += [f"# HELP {name} Time spent per scrape phase.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for phase, histogram in sorted(self._histograms.items()):
+                cumulative = 0.0
+                for bound, value in zip(BUCKETS, histogram):
+                    cumulative += value
+                    lines.append(f'{name}_bucket{{phase="{phase}",le="{bound}"}} {cumulative:g}')
+                lines.append(f'{name}_bucket{{phase="{phase}",le="+Inf"}} {histogram[-1]:g}')
+                lines.append(f'{name}_sum{{phase="{phase}"}} {histogram[-2]:.6f}')
+                lines.append(f'{name}_count{{phase="{phase}"}} {histogram[-1]:g}')
+
+            name = f"{self.prefix}_events_total"
+            lines += [f"# HELP {name} Scrape event counters.", f"# TYPE {name} counter"]
+            for event, value in sorted(self._counters.items()):
+                lines.append(f'{name}{{event="{event}"}} {value:g}')
+
+            name = f"{self.prefix}_jobs_total"
+            lines += [f"# HELP {name} Finished jobs by status.", f"# TYPE {name} counter"]
+            for status, value in sorted(self._jobs.items()):
+                lines.append(f'{name}{{status="{status}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,190 @@
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+
+from lead_store import identity_keys, normalize_phone, normalize_text, website_domain
+from protocol import LEAD_FIELDS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Numbers without a "+" or "00" prefix are read as national numbers of this
+# country: a leading trunk "0" is dropped, and the code is prepended unless
+# the number is already longer than NATIONAL_DIGITS and starts with it.
+DEFAULT_COUNTRY_CODE = "1"
+NATIONAL_DIGITS = 10
+MIN_E164_DIGITS = 8
+MAX_E164_DIGITS = 15
+# Review counts at or above this get the full reviews component.
+REVIEWS_SATURATION = 500
+
+# Score components, each scaled to 0..1: rating / 5, log-scaled review
+# count, and whether the lead has an email, a website and a phone number.
+SCORE_COMPONENTS = ["rating", "reviews", "email", "website", "phone"]
+DEFAULT_SCORE_WEIGHTS = {"rating": 0.3, "reviews": 0.3, "email": 0.25, "website": 0.15, "phone": 0.0}
+
+SOCIAL_NETWORKS = {
+    "facebook": "facebook",
+    "fb": "facebook",
+    "instagram": "instagram",
+    "linkedin": "linkedin",
+    "twitter": "twitter",
+    "x": "twitter",
+    "youtube": "youtube",
+    "youtu": "youtube",
+    "tiktok": "tiktok",
+    "pinterest": "pinterest",
+}
+SOCIAL_COLUMNS = {network: network.capitalize() for network in dict.fromkeys(SOCIAL_NETWORKS.values())}
+NORMALIZED_FIELDS = LEAD_FIELDS + ["Phone E164", "Domain", *SOCIAL_COLUMNS.values(), "Dedup Key", "Score"]
+
+# Each pattern does the trimming/case folding itself, so a column needs as few
+# passes as possible: every pandas string operation is a loop over the rows.
+EMAIL_PATTERN = re.compile(r"^\s*([a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,})\s*$", re.IGNORECASE)
+SOCIAL_HOST_PATTERN = re.compile(
+    r"^\s*(?:https?://)?(?:[a-z0-9-]+\.)*(" + "|".join(SOCIAL_NETWORKS) + r")\.(?:com|be)(?:[/:?#]|$)",
+    re.IGNORECASE,
+)
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """Read ``"rating=0.5,email=0.5"`` into score weights.
+
+    Components not named keep their ``DEFAULT_SCORE_WEIGHTS`` value. Raises
+    ``ValueError`` on unknown components or negative weights.
+    """
+    weights = dict(DEFAULT_SCORE_WEIGHTS)
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name not in SCORE_COMPONENTS:
+            raise ValueError(f"Unknown score component {name!r}; expected one of {', '.join(SCORE_COMPONENTS)}.")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight for {name}: {value.strip()!r}") from None
+        if weight < 0:
+            raise ValueError(f"Weight for {name} must not be negative.")
+        weights[name] = weight
+    if not any(weights.values()):
+        raise ValueError("At least one score weight must be positive.")
+    return weights
+
+
+def to_e164(
+    phone: Any, country_code: str = DEFAULT_COUNTRY_CODE, national_digits: int = NATIONAL_DIGITS
+) -> Optional[str]:
+    """``phone`` as ``+<digits>``, or None when it can't be a valid number.
+
+    Starts from ``lead_store.normalize_phone``, so the digits are the ones
+    the lead store matches on.
+    """
+    digits = normalize_phone(phone) if isinstance(phone, str) else None
+    if not digits:
+        return None
+    if phone.lstrip().startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]
+    elif digits.startswith("0"):
+        number = country_code + digits[1:]
+    elif len(digits) > national_digits and digits.startswith(country_code):
+        number = digits
+    else:
+        number = country_code + digits
+    return f"+{number}" if MIN_E164_DIGITS <= len(number) <= MAX_E164_DIGITS else None
+
+
+def _socials(links: "pd.Series") -> "pd.DataFrame":
+    import pandas as pd
+
+    # One row per link, keeping the lead's index; strings count as single links.
+    exploded = links.explode().dropna().astype(str)
+    network = exploded.str.extract(SOCIAL_HOST_PATTERN, expand=False).str.lower().map(SOCIAL_NETWORKS)
+    found = pd.DataFrame({"lead": exploded.index, "network": network.to_numpy(), "url": exploded.to_numpy()})
+    found = found.dropna(subset=["network"]).drop_duplicates(["lead", "network"])
+    by_network = found.pivot(index="lead", columns="network", values="url")
+    return by_network.reindex(index=links.index, columns=list(SOCIAL_COLUMNS)).rename(columns=SOCIAL_COLUMNS)
+
+
+def _identity_keys(frame: "pd.DataFrame") -> Iterator[List[str]]:
+    # ``lead_store.lead_keys`` per row, reusing the Domain column.
+    for name, phone, domain in zip(frame["Name"].tolist(), frame["Phone"].tolist(), frame["Domain"].tolist()):
+        yield identity_keys(
+            normalize_text(name) if isinstance(name, str) else "",
+            normalize_phone(phone) if isinstance(phone, str) else None,
+            domain if isinstance(domain, str) else None,
+        )
+
+
+def normalize_leads(
+    leads: Iterable[Dict[str, Any]],
+    country_code: str = DEFAULT_COUNTRY_CODE,
+    national_digits: int = NATIONAL_DIGITS,
+    weights: Optional[Dict[str, float]] = None,
+) -> "pd.DataFrame":
+    """Normalize a batch of leads into a DataFrame with ``NORMALIZED_FIELDS`` columns.
+
+    Every step is a column operation over the whole batch: ratings and
+    review counts become numbers, emails are lowercased (invalid ones
+    dropped), phones become E.164 (``Phone E164``), websites are reduced to
+    a ``Domain`` without ``www.`` (``lead_store.website_domain``), and social
+    links are grouped into one column per network. ``Dedup Key`` is the
+    lead's first ``lead_store.lead_keys`` key. ``Score`` is the weighted
+    mean of the ``SCORE_COMPONENTS`` on a 0-100 scale.
+    """
+    import numpy as np
+    import pandas as pd
+
+    weights = weights or DEFAULT_SCORE_WEIGHTS
+    leads = list(leads)
+    frame = pd.DataFrame.from_records(leads, columns=LEAD_FIELDS)
+
+    rating = frame["Rating"].astype("string").str.replace(",", ".", regex=False)
+    frame["Rating"] = pd.to_numeric(rating, errors="coerce").clip(0, 5)
+    frame["Review Count"] = pd.to_numeric(frame["Review Count"], errors="coerce").clip(lower=0).astype("Int64")
+    frame["Email"] = frame["Email"].astype("string").str.extract(EMAIL_PATTERN, expand=False).str.lower()
+    # Phones, domains and keys go through the lead store's own helpers, one
+    # lead at a time, so they can't drift from how the store matches leads.
+    frame["Phone E164"] = [to_e164(lead.get("Phone"), country_code, national_digits) for lead in leads]
+    websites = frame["Website"].tolist()
+    frame["Domain"] = [website_domain(website) if isinstance(website, str) else None for website in websites]
+    frame = frame.join(_socials(frame["Social Links"]))
+    frame["Dedup Key"] = [keys[0] for keys in _identity_keys(frame)]
+
+    components = {
+        "rating": (frame["Rating"] / 5).fillna(0.0),
+        "reviews": (np.log1p(frame["Review Count"].fillna(0).astype(float)) / np.log1p(REVIEWS_SATURATION)).clip(
+            upper=1.0
+        ),
+        "email": frame["Email"].notna().astype(float),
+        "website": frame["Domain"].notna().astype(float),
+        "phone": frame["Phone E164"].notna().astype(float),
+    }
+    total = sum(weights.get(name, 0.0) for name in SCORE_COMPONENTS) or 1.0
+    score = sum(components[name] * weights.get(name, 0.0) for name in SCORE_COMPONENTS)
+    frame["Score"] = (score / total * 100).round(1)
+    return frame[NORMALIZED_FIELDS]
+
+
+def dedupe(frame: "pd.DataFrame") -> "pd.DataFrame":
+    """Drop duplicates the way ``LeadStore`` merges leads, keeping the best-scored one.
+
+    Leads sharing any ``lead_store.lead_keys`` key are duplicates, so two
+    businesses with one phone number but different names and websites both
+    stay. The result keeps the original order.
+    """
+    ranked = frame.sort_values("Score", ascending=False, kind="stable")
+    seen = set()
+    keep = []
+    for label, keys in zip(ranked.index, _identity_keys(ranked)):
+        if seen.isdisjoint(keys):
+            keep.append(label)
+        seen.update(keys)
+    return frame[frame.index.isin(keep)]
+
+
+def to_records(frame: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """Rows as JSON-ready dicts, with missing values as None."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Backoff reasons reported by the scraper, with the wording used in logs.
+BACKOFF_REASONS = {
+    "consent": "a consent wall",
+    "captcha": "a CAPTCHA",
+    "empty_feed": "an empty results feed",
+    "timeout": "a timeout",
+}
+MAX_TRACKED_HOSTS = 10000
+MAX_RECENT_EVENTS = 20
+
+
+class PacingController:
+    """Delay between Maps requests (navigations, feed scrolls, tab batches).
+
+    One controller is shared by every scrape in the process, since they all
+    come from the same IP. Each fast success shrinks the delay by
+    ``speedup`` down to ``min_delay``; a backoff signal (consent wall,
+    CAPTCHA, empty feed, timeout) multiplies it by ``backoff`` up to
+    ``max_delay``. Signals arriving within one delay of the previous backoff
+    are counted but don't compound, so several jobs hitting the same wall at
+    once back off only once.
+    """
+
+    def __init__(
+        self,
+        min_delay: float = 0.2,
+        max_delay: float = 60.0,
+        initial_delay: float = 1.0,
+        speedup: float = 0.9,
+        backoff: float = 2.0,
+        fast_seconds: float = 2.0,
+        hosts: Optional["HostBuckets"] = None,
+    ) -> None:
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.speedup = speedup
+        self.backoff_factor = backoff
+        self.fast_seconds = fast_seconds
+        self.hosts = hosts or HostBuckets()
+        self._delay = max(min_delay, min(initial_delay, max_delay))
+        self._last_backoff = 0.0
+        self._backoffs: Dict[str, int] = {}
+        self._recent: List[Dict[str, Any]] = []
+        self._waited = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> float:
+        return self._delay
+
+    def wait(self, stop_event=None) -> float:
+        """Sleep for the current delay (cut short by ``stop_event``); returns the delay."""
+        delay = self._delay
+        if delay > 0:
+            if stop_event is not None:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+            with self._lock:
+                self._waited += delay
+        return delay
+
+    def success(self, seconds: float) -> None:
+        """Report a request that succeeded after ``seconds``; only fast ones speed the pace up."""
+        if seconds > self.fast_seconds:
+            return
+        with self._lock:
+            self._delay = max(self.min_delay, self._delay * self.speedup)
+
+    def penalize(self, reason: str) -> float:
+        """Report a throttling signal; returns the resulting delay."""
+        now = time.monotonic()
+        with self._lock:
+            self._backoffs[reason] = self._backoffs.get(reason, 0) + 1
+            if now - self._last_backoff >= self._delay:
+                self._delay = min(self.max_delay, max(self._delay, 1.0) * self.backoff_factor)
+                self._last_backoff = now
+            self._recent.append({"reason": reason, "at": time.time(), "delay": round(self._delay, 2)})
+            del self._recent[:-MAX_RECENT_EVENTS]
+            return self._delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "delay_seconds": round(self._delay, 3),
+                "min_delay_seconds": self.min_delay,
+                "max_delay_seconds": self.max_delay,
+                "waited_seconds": round(self._waited, 1),
+                "backoffs": dict(self._backoffs),
+                "recent_backoffs": list(self._recent),
+                "hosts": self.hosts.stats(),
+            }
+
+
+class HostBuckets:
+    """Per-host token buckets for website fetches during enrichment.
+
+    Each host may be hit ``rate`` times per second with bursts of ``burst``.
+    ``reserve`` is thread-safe and returns how long the caller must wait
+    before sending, so it works from any event loop. A 429/503 halves that
+    host's rate (down to ``min_rate``); successes restore it gradually.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, min_rate: float = 0.1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.throttled = 0
+        # host -> [tokens, last refill (monotonic), rate]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str, now: float) -> List[float]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_HOSTS:
+                self._prune(now)
+            bucket = self._buckets[host] = [float(self.burst), now, self.rate]
+        bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * bucket[2])
+        bucket[1] = now
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        for host, (tokens, refilled, rate) in list(self._buckets.items()):
+            if rate >= self.rate and tokens + (now - refilled) * rate >= self.burst:
+                del self._buckets[host]
+
+    def reserve(self, host: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+            bucket[0] -= 1
+            return 0.0 if bucket[0] >= 0 else -bucket[0] / bucket[2]
+
+    def penalize(self, host: str) -> None:
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            bucket[2] = max(self.min_rate, bucket[2] / 2)
+            self.throttled += 1
+
+    def reward(self, host: str) -> None:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is not None and bucket[2] < self.rate:
+                bucket[2] = min(self.rate, bucket[2] + self.min_rate)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            slowed = sum(1 for _, _, rate in self._buckets.values() if rate < self.rate)
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "tracked": len(self._buckets),
+                "slowed": slowed,
+                "throttled_responses": self.throttled,
+            }
+
+
+def describe(reason: Optional[str]) -> str:
+    return BACKOFF_REASONS.get(reason or "", reason or "an unknown signal")
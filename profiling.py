@@ -0,0 +1,177 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import shutil
+import threading
+import time
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+STALL_INTERVAL_SECONDS = 0.05
+STALL_THRESHOLD_SECONDS = 0.1
+PSTATS_TOP = 60
+
+
+class ProfileStore:
+    """Finished profile bundles (``<job_id>.zip``) with a total size cap and an age limit."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: float) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.zip")
+
+    def workdir(self, job_id: str) -> str:
+        path = os.path.join(self.directory, f"{job_id}.parts")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _bundles(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".zip"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def cleanup(self) -> None:
+        """Drop bundles past the age limit, then the oldest ones until under ``max_bytes``."""
+        with self._lock:
+            cutoff = time.time() - self.ttl_seconds
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                # Working directories left behind by a crash mid-profile.
+                if name.endswith(".parts") and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            entries = self._bundles()
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.evictions += 1
+                total -= size
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {"job_id": os.path.basename(path)[: -len(".zip")], "bytes": size, "created_at": mtime}
+            for mtime, size, path in reversed(self._bundles())
+        ]
+
+
+class LoopStallMonitor:
+    """Measures how late the event loop wakes up from short sleeps.
+
+    Any wake-up later than ``threshold`` is recorded as a stall: something
+    blocked the loop (and every WebSocket with it) for that long.
+    """
+
+    def __init__(self, interval: float = STALL_INTERVAL_SECONDS, threshold: float = STALL_THRESHOLD_SECONDS) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: List[Tuple[float, float]] = []
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            self.samples += 1
+            if lag >= self.threshold:
+                self.stalls.append((time.time(), lag))
+
+    def report(self) -> str:
+        lines = [
+            f"# {len(self.stalls)} stalls >= {self.threshold * 1000:.0f} ms "
+            f"in {self.samples} samples every {self.interval * 1000:.0f} ms",
+        ]
+        for at, lag in self.stalls:
+            stamp = time.strftime("%H:%M:%S", time.localtime(at)) + f".{int(at % 1 * 1000):03d}"
+            lines.append(f"{stamp}\t{lag * 1000:.1f} ms")
+        return "\n".join(lines) + "\n"
+
+
+class ProfileSession:
+    """Collects the artifacts of one profiled job and bundles them into a zip.
+
+    ``profile_call`` must run on the thread that owns ``context`` (the
+    browser slot's thread): it records a Playwright trace of the context and
+    a cProfile of that thread around the scrape.
+    """
+
+    def __init__(self, store: ProfileStore, job_id: str, details: Dict[str, Any]) -> None:
+        self.store = store
+        self.job_id = job_id
+        self.details = details
+        self.notes: List[str] = []
+        self.monitor = LoopStallMonitor()
+        self._workdir = store.workdir(job_id)
+
+    def _part(self, name: str) -> str:
+        return os.path.join(self._workdir, name)
+
+    def profile_call(self, context, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        tracing = False
+        try:
+            context.tracing.start(screenshots=True, snapshots=True)
+            tracing = True
+        except Exception as exc:
+            self.notes.append(f"Playwright trace unavailable: {exc}")
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(self._part("scraper.prof"))
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PSTATS_TOP)
+            with open(self._part("scraper_profile.txt"), "w", encoding="utf-8") as handle:
+                handle.write(summary.getvalue())
+            if tracing:
+                try:
+                    context.tracing.stop(path=self._part("playwright_trace.zip"))
+                except Exception as exc:
+                    self.notes.append(f"Playwright trace not saved: {exc}")
+
+    def finish(self) -> str:
+        """Bundle everything into ``<job_id>.zip``, apply the store limits and return the bundle path."""
+        with open(self._part("event_loop_stalls.log"), "w", encoding="utf-8") as handle:
+            handle.write(self.monitor.report())
+        with open(self._part("profile.json"), "w", encoding="utf-8") as handle:
+            json.dump(dict(self.details, job_id=self.job_id, notes=self.notes), handle, indent=2)
+        path = self.store.path(self.job_id)
+        tmp_path = f"{path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for name in sorted(os.listdir(self._workdir)):
+                bundle.write(self._part(name), arcname=name)
+        os.replace(tmp_path, path)
+        shutil.rmtree(self._workdir, ignore_errors=True)
+        self.store.cleanup()
+        return path
@@ -0,0 +1,79 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Version 1 is the original one-string-per-message stream ("__LEAD__:{...}",
+# "__PROGRESS__:...", plain log lines). Version 2 batches structured events
+# into one JSON frame: {"v": 2, "events": [...]}.
+LEGACY_PROTOCOL = 1
+BATCH_PROTOCOL = 2
+SUPPORTED_PROTOCOLS = (LEGACY_PROTOCOL, BATCH_PROTOCOL)
+
+# Leads and enrichment updates travel as positional arrays in this order;
+# the field lists are sent once in the hello event.
+LEAD_FIELDS = ["Name", "Phone", "Website", "Rating", "Review Count", "Social Links", "Email"]
+# Phone and Website come last so older clients' positions still line up;
+# with Name they identify the lead an update belongs to.
+ENRICH_FIELDS = ["Name", "Email", "Social Links", "Phone", "Website"]
+
+_PAYLOAD_EVENTS = {
+    "__LEAD__:": ("lead", LEAD_FIELDS),
+    "__ENRICH__:": ("enrich", ENRICH_FIELDS),
+}
+_TEXT_EVENTS = {
+    "__PROGRESS__:": "progress",
+}
+_BARE_EVENTS = {
+    "__SCRAPE_DONE__": "done",
+    "__PONG__": "pong",
+}
+
+
+def enrich_message(lead: Dict[str, Any]) -> str:
+    """The ``__ENRICH__:`` line for a lead that deep search has filled in."""
+    update = {field: lead.get(field) for field in ENRICH_FIELDS}
+    update["Social Links"] = update["Social Links"] or []
+    return "__ENRICH__:" + json.dumps(update, ensure_ascii=False)
+
+
+def parse_protocol(value: Any) -> int:
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        return LEGACY_PROTOCOL
+    return version if version in SUPPORTED_PROTOCOLS else LEGACY_PROTOCOL
+
+
+def hello_event() -> Dict[str, Any]:
+    return {"t": "hello", "v": BATCH_PROTOCOL, "lead_fields": LEAD_FIELDS, "enrich_fields": ENRICH_FIELDS}
+
+
+def encode_event(message: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """Translate a legacy stream message into a compact version-2 event."""
+    event: Dict[str, Any]
+    if message in _BARE_EVENTS:
+        event = {"t": _BARE_EVENTS[message]}
+    elif message.startswith("__SUGGEST__:"):
+        event = {"t": "suggest", "d": json.loads(message[len("__SUGGEST__:"):])}
+    elif message.startswith("__SUGGEST_LOCATION__:"):
+        event = {"t": "suggest", "f": "location", "d": json.loads(message[len("__SUGGEST_LOCATION__:"):])}
+    elif message.startswith("__METRICS__:"):
+        event = {"t": "metrics", "d": json.loads(message[len("__METRICS__:"):])}
+    else:
+        event = {"t": "log", "m": message}
+        for prefix, (name, fields) in _PAYLOAD_EVENTS.items():
+            if message.startswith(prefix):
+                payload = json.loads(message[len(prefix):])
+                event = {"t": name, "d": [payload.get(key) for key in fields]}
+                break
+        else:
+            for prefix, name in _TEXT_EVENTS.items():
+                if message.startswith(prefix):
+                    event = {"t": name, "m": message[len(prefix):]}
+                    break
+    if job_id is not None:
+        event["j"] = job_id
+    return event
+
+
+def encode_frame(events: List[Dict[str, Any]]) -> str:
+    return json.dumps({"v": BATCH_PROTOCOL, "events": events}, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+QueryKey = Tuple[str, str, bool, int]
+
+
+def _normalize_text(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+def make_key(keyword: str, location: str, deep_search: bool, max_results: int) -> QueryKey:
+    return (_normalize_text(keyword), _normalize_text(location), bool(deep_search), int(max_results))
+
+
+class QueryCache:
+    """On-disk cache of finished scrape results keyed by the normalized query.
+
+    One JSON file per query under ``directory``. Entries expire after
+    ``ttl_seconds``; when the directory grows past ``max_bytes`` the least
+    recently used files (by mtime, refreshed on every hit) are evicted.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int) -> None:
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: QueryKey) -> str:
+        digest = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: QueryKey) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    entry = json.load(handle)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                self._remove(path)
+                self.misses += 1
+                return None
+            os.utime(path)
+            self.hits += 1
+            return entry["leads"]
+
+    def put(self, key: QueryKey, leads: List[Dict[str, Any]]) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump({"key": list(key), "created_at": time.time(), "leads": leads}, handle, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            self.evictions += 1
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+            "max_bytes": self.max_bytes,
+        }
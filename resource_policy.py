@@ -0,0 +1,115 @@
+import re
+from typing import Any, Dict, Iterable, Optional, Union
+
+# Aborted requests never download, so skipped bytes are estimated from
+# typical transfer sizes per resource type.
+ESTIMATED_BYTES = {
+    "image": 25_000,
+    "media": 250_000,
+    "font": 35_000,
+    "stylesheet": 20_000,
+    "script": 60_000,
+    "fetch": 15_000,
+    "xhr": 15_000,
+    "other": 5_000,
+}
+
+TRACKER_PATTERNS = [
+    r"doubleclick\.net",
+    r"googletagmanager\.com",
+    r"google-analytics\.com",
+    r"googlesyndication\.com",
+    r"connect\.facebook\.net",
+    r"hotjar\.com",
+    r"clarity\.ms",
+    r"segment\.(?:io|com)",
+    r"intercom(?:cdn)?\.io",
+]
+
+# Map tiles, Street View imagery and Maps' own telemetry beacons; the
+# scraper only reads the feed and the detail panel.
+MAPS_NOISE_PATTERNS = [
+    r"/maps/vt",
+    r"khms\d*\.google",
+    r"streetviewpixels",
+    r"/maps/preview/log",
+    r"/gen_204",
+    r"play\.google\.com/log",
+]
+
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "full": {"types": [], "patterns": []},
+    "lean": {
+        "types": ["image", "media", "font"],
+        "patterns": MAPS_NOISE_PATTERNS + TRACKER_PATTERNS,
+    },
+}
+DEFAULT_PRESET = "full"
+
+
+class ResourcePolicy:
+    """Aborts browser requests by resource type or URL pattern.
+
+    Attach it to a context with ``attach``; ``stats()`` reports how many
+    requests were skipped and roughly how many bytes that saved.
+    """
+
+    def __init__(self, name: str, blocked_types: Iterable[str] = (), blocked_patterns: Iterable[str] = ()) -> None:
+        self.name = name
+        self.blocked_types = frozenset(blocked_types)
+        self._url_pattern = re.compile("|".join(blocked_patterns)) if blocked_patterns else None
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    @classmethod
+    def preset(cls, name: str) -> "ResourcePolicy":
+        if name not in PRESETS:
+            raise ValueError(f"Unknown resource policy '{name}'. Expected one of: {', '.join(PRESETS)}")
+        config = PRESETS[name]
+        return cls(name, config["types"], config["patterns"])
+
+    @property
+    def is_passthrough(self) -> bool:
+        return not self.blocked_types and self._url_pattern is None
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_types:
+            return True
+        return bool(self._url_pattern and self._url_pattern.search(url))
+
+    def attach(self, context) -> None:
+        # "full" keeps the previous behavior exactly: no route, no per-request IPC.
+        if not self.is_passthrough:
+            context.route("**/*", self._handle)
+
+    def detach(self, context) -> None:
+        if not self.is_passthrough:
+            context.unroute("**/*", self._handle)
+
+    def _handle(self, route, request) -> None:
+        resource_type = request.resource_type
+        if self.should_block(resource_type, request.url):
+            self.blocked += 1
+            self.blocked_bytes += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES["other"])
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            route.abort("blockedbyclient")
+        else:
+            self.allowed += 1
+            route.fallback()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.name,
+            "requests_allowed": self.allowed,
+            "requests_blocked": self.blocked,
+            "bytes_skipped_estimate": self.blocked_bytes,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+def resolve_policy(policy: Optional[Union[str, ResourcePolicy]]) -> ResourcePolicy:
+    if isinstance(policy, ResourcePolicy):
+        return policy
+    return ResourcePolicy.preset(policy or DEFAULT_PRESET)
@@ -1,13 +1,166 @@
+import asyncio
+import collections
+import concurrent.futures
+import functools
 import json
-import random
+import os
+import queue
 import re
+import threading
 import time
+from urllib.parse import quote_plus
 
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 from playwright_stealth.stealth import Stealth
 
+from enrichment import EMAIL_PATTERN, SOCIAL_PATTERN, Enricher
+from metrics import NULL_METRICS
+from pacing import PacingController, describe
+from protocol import enrich_message
+from resource_policy import resolve_policy
+
 SHOW_BROWSER = False
 MAX_RESULTS = 100
+MAX_PARALLEL_TABS = 1
+# Overridable so benchmarks can point the scraper at a local stand-in
+# (benchmarks/maps_standin.py).
+MAPS_URL = os.environ.get("MAPS_BASE_URL", "https://www.google.com/maps").rstrip("/")
+
+# Upper bounds for the condition-based waits; they normally return as soon
+# as the page signals readiness.
+DETAIL_WAIT_MS = 4000
+FEED_WAIT_MS = 6000
+ENRICH_IDLE_WAIT_MS = 5000
+WAIT_STEP_MS = 250
+# Minimum spacing between progress checkpoints; one is always written when
+# the feed loop exits.
+CHECKPOINT_INTERVAL_SECONDS = 15
+
+# Event kinds yielded by iter_scrape_google_maps.
+LEAD = "lead"
+ENRICH = "enrich"
+# Events aiter_scrape_google_maps holds before the scrape waits for its consumer.
+SCRAPE_BUFFER_SIZE = 64
+_SCRAPE_DONE = object()
+
+# Used by callers that don't pass their own controller (the desktop app,
+# shard worker processes); still shared by every scrape in the process.
+DEFAULT_PACER = PacingController()
+# Back-offs that mean Maps may have withheld results; each one also counts
+# as "degraded", and callers don't cache a degraded run.
+DEGRADED_REASONS = ("captcha", "empty_feed", "timeout")
+CAPTCHA_SELECTOR = "form#captcha-form, iframe[src*='recaptcha'], div#recaptcha"
+
+RATING_SELECTOR = (
+    "[aria-label*='stars'], [aria-label*='reviews'], "
+    "[aria-label*='étoile'], [aria-label*='etoile'], [aria-label*='avis']"
+)
+RATING_KEYS = ["star", "review", "étoile", "etoile", "avis"]
+# Compiled once; these run for every listing on the scraping thread.
+RATING_PATTERN = re.compile(r"([0-9]+[\.,]?[0-9]*)\s*(stars?|étoiles?|etoiles?)", re.IGNORECASE)
+REVIEWS_PATTERN = re.compile(r"([0-9][0-9,]*)\s*(reviews?|avis)", re.IGNORECASE)
+INLINE_RATING_PATTERN = re.compile(r"([0-9]+\.?[0-9]*)\s*\(([^)]+)\)")
+COUNT_PATTERN = re.compile(r"([0-9][0-9,]*)")
+PHONE_JUNK_PATTERN = re.compile(r"[^0-9+]+")
+
+# Reads href, text and rating label of a slice of feed cards in one call so
+# the multi-tab mode doesn't pay a round trip per card.
+COLLECT_CARDS_JS = """
+([start, end, selector, keys]) => {
+    const cards = Array.from(document.querySelectorAll("div[role='feed'] div[role='article']"));
+    return cards.slice(start, end).map((card) => {
+        const link = card.querySelector("a[href*='/maps/place/']");
+        let ratingLabel = null;
+        for (const el of Array.from(card.querySelectorAll(selector)).slice(0, 3)) {
+            const label = el.getAttribute("aria-label");
+            if (label && keys.some((key) => label.toLowerCase().includes(key))) {
+                ratingLabel = label;
+                break;
+            }
+        }
+        return { href: link ? link.href : null, text: card.innerText || "", rating_label: ratingLabel };
+    });
+}
+"""
+
+# Resolves once the detail panel shows a listing other than ``previousName``,
+# or a freshly rendered heading (one this script has not marked yet), so two
+# listings with the same name in a row don't wait out the timeout when the
+# panel is rebuilt.
+DETAIL_CHANGED_JS = """
+(previousName) => {
+    const heading = document.querySelector("h1.DUwDvf") || document.querySelector("h1[aria-level='1']");
+    const name = heading && heading.textContent ? heading.textContent.trim() : "";
+    if (name === "" || (name === previousName && heading.dataset.leadbotSeen)) {
+        return false;
+    }
+    heading.dataset.leadbotSeen = "1";
+    return true;
+}
+"""
+PANEL_NAME_JS = """
+() => {
+    const heading = document.querySelector("h1.DUwDvf") || document.querySelector("h1[aria-level='1']");
+    return heading && heading.textContent ? heading.textContent.trim() : null;
+}
+"""
+
+# Resolves with "end" once Maps shows its end-of-list marker, or "grew" once
+# the feed holds more than ``previousCount`` cards.
+FEED_GROWTH_JS = """
+(previousCount) => {
+    const feed = document.querySelector("div[role='feed']");
+    if (!feed) {
+        return false;
+    }
+    if (feed.querySelector("span.HlvSq") || /reached the end of the list/i.test(feed.innerText)) {
+        return "end";
+    }
+    return feed.querySelectorAll("div[role='article']").length > previousCount ? "grew" : false;
+}
+"""
+
+# Snapshot of the open detail panel (plus the feed card at ``cardIndex``)
+# in a single round trip; mirrors the selector chain in
+# _extract_details_with_selectors, which stays as the fallback.
+EXTRACT_DETAILS_JS = """
+([cardIndex, selector, keys]) => {
+    const text = (el) => (el && el.textContent ? el.textContent.trim() : null);
+    const ratingLabel = (root, limit) => {
+        if (!root) {
+            return null;
+        }
+        for (const el of Array.from(root.querySelectorAll(selector)).slice(0, limit)) {
+            const label = el.getAttribute("aria-label");
+            if (label && keys.some((key) => label.toLowerCase().includes(key))) {
+                return label;
+            }
+        }
+        return null;
+    };
+    const card = cardIndex === null
+        ? null
+        : document.querySelectorAll("div[role='feed'] div[role='article']")[cardIndex] || null;
+    const websiteLink = document.querySelector("a[data-item-id='authority']");
+    const websiteButton = document.querySelector("button[data-item-id='authority']");
+    let website = null;
+    if (websiteLink) {
+        website = websiteLink.getAttribute("href");
+    } else if (websiteButton) {
+        website = websiteButton.getAttribute("data-url");
+    }
+    return {
+        name: text(document.querySelector("h1.DUwDvf")) || text(document.querySelector("h1[aria-level='1']")),
+        card_rating_label: ratingLabel(card, 3),
+        panel_rating_label: ratingLabel(document.querySelector("div[role='main']"), 5),
+        phone: text(document.querySelector("button[data-item-id^='phone:']"))
+            || text(document.querySelector("button[data-item-id*='phone']")),
+        website: website,
+        card_text: card ? card.innerText : null,
+    };
+}
+"""
 
 
 def _safe_text(locator):
@@ -20,14 +173,14 @@ def _safe_text(locator):
 def _parse_rating_and_reviews(text):
     if not text:
         return None, None
-    rating_match = re.search(r"([0-9]+[\.,]?[0-9]*)\s*(stars?|étoiles?|etoiles?)", text, re.IGNORECASE)
-    reviews_match = re.search(r"([0-9][0-9,]*)\s*(reviews?|avis)", text, re.IGNORECASE)
+    rating_match = RATING_PATTERN.search(text)
+    reviews_match = REVIEWS_PATTERN.search(text)
 
     if not rating_match and not reviews_match:
-        inline_match = re.search(r"([0-9]+\.?[0-9]*)\s*\(([^)]+)\)", text)
+        inline_match = INLINE_RATING_PATTERN.search(text)
         if inline_match:
             rating_match = inline_match
-            reviews_match = re.search(r"([0-9][0-9,]*)", inline_match.group(2))
+            reviews_match = COUNT_PATTERN.search(inline_match.group(2))
 
     rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
     reviews = int(reviews_match.group(1).replace(",", "")) if reviews_match else None
@@ -37,23 +190,83 @@ def _parse_rating_and_reviews(text):
 def _clean_phone(text):
     if not text:
         return None
-    cleaned = re.sub(r"[^0-9+]+", " ", text)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned = PHONE_JUNK_PATTERN.sub(" ", text).strip()
     return cleaned or None
 
 
-def _wait_with_stop(page, total_ms, stop_event):
-    if not total_ms:
+def _wait_until(wait, timeout_ms, stop_event, step_ms=WAIT_STEP_MS):
+    """Call ``wait(timeout)`` in short slices until it succeeds.
+
+    Returns whatever ``wait`` returned, or ``None`` on timeout or when
+    ``stop_event`` is set, so stops are honored within ``step_ms``.
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    while True:
+        if stop_event and stop_event.is_set():
+            return None
+        remaining_ms = (deadline - time.monotonic()) * 1000
+        if remaining_ms <= 0:
+            return None
+        try:
+            return wait(max(1, min(step_ms, remaining_ms)))
+        except PlaywrightTimeoutError:
+            continue
+
+
+def _wait_for_js(page, expression, arg, timeout_ms, stop_event):
+    return _wait_until(
+        lambda timeout: page.wait_for_function(expression, arg=arg, timeout=timeout, polling=100).json_value(),
+        timeout_ms,
+        stop_event,
+    )
+
+
+def launch_browser(playwright, show_browser=SHOW_BROWSER):
+    return playwright.chromium.launch(
+        headless=not show_browser,
+        args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
+    )
+
+
+def new_stealth_context(browser):
+    context = browser.new_context(locale="en-US")
+    Stealth().apply_stealth_sync(context)
+    return context
+
+
+def open_maps_home(page):
+    """Open Maps and dismiss the consent wall; returns True if one was shown."""
+    page.goto(MAPS_URL, wait_until="domcontentloaded", timeout=60000)
+    for text in ["Accept all", "I agree", "Accept"]:
+        button = page.locator(f"button:has-text('{text}')")
+        if button.count() > 0:
+            button.first.click()
+            return True
+    return "consent." in page.url
+
+
+def _captcha_shown(page):
+    if "/sorry/" in page.url:
         return True
-    if stop_event and stop_event.is_set():
+    try:
+        return page.locator(CAPTCHA_SELECTOR).count() > 0
+    except Exception:
         return False
-    step = 100
-    steps = max(1, total_ms // step)
-    for _ in range(steps):
-        if stop_event and stop_event.is_set():
-            return False
-        page.wait_for_timeout(step)
-    return True
+
+
+def _panel_name(page):
+    try:
+        return page.evaluate(PANEL_NAME_JS)
+    except Exception:
+        return None
+
+
+def _back_off(pacer, reason, log, metrics):
+    delay = pacer.penalize(reason)
+    metrics.count(f"backoff_{reason}")
+    if reason in DEGRADED_REASONS:
+        metrics.count("degraded")
+    log(f"Backing off after {describe(reason)}: requests now {delay:.1f}s apart.")
 
 
 def scrape_google_maps(
@@ -64,230 +277,667 @@ def scrape_google_maps(
     show_browser=SHOW_BROWSER,
     stop_event=None,
     deep_search=False,
+    context=None,
+    max_parallel_tabs=MAX_PARALLEL_TABS,
+    resource_policy=None,
+    lead_callback=None,
+    enrich_cache=None,
+    search_center=None,
+    resume_state=None,
+    checkpoint_callback=None,
+    metrics=None,
+    pacer=None,
 ):
-    leads = []
-    seen = set()
-
-    def log(message):
+    """Scrape Maps listings and return them as a list.
+
+    A thin wrapper over ``iter_scrape_google_maps`` (see there for the
+    parameters) for callers that want every lead at once. It also sends the
+    ``__LEAD__:``/``__ENRICH__:`` lines the dashboard protocol uses through
+    ``log_callback``, which the shard workers forward as-is.
+    """
+    leads = list((resume_state or {}).get("leads", []))
+    for kind, lead in iter_scrape_google_maps(
+        query, location, log_callback, max_results, show_browser, stop_event, deep_search, context,
+        max_parallel_tabs, resource_policy, lead_callback, enrich_cache, search_center, resume_state,
+        checkpoint_callback, metrics, pacer,
+    ):
+        if kind == LEAD:
+            leads.append(lead)
         if log_callback:
-            log_callback(message)
+            log_callback(event_message(kind, lead))
+    return leads
+
+
+def event_message(kind, lead):
+    """The dashboard line for a ``(kind, lead)`` event from ``iter_scrape_google_maps``."""
+    if kind == LEAD:
+        return f"__LEAD__:{json.dumps(lead, ensure_ascii=False)}"
+    return enrich_message(lead)
+
+
+def iter_scrape_google_maps(
+    query,
+    location,
+    log_callback,
+    max_results=MAX_RESULTS,
+    show_browser=SHOW_BROWSER,
+    stop_event=None,
+    deep_search=False,
+    context=None,
+    max_parallel_tabs=MAX_PARALLEL_TABS,
+    resource_policy=None,
+    lead_callback=None,
+    enrich_cache=None,
+    search_center=None,
+    resume_state=None,
+    checkpoint_callback=None,
+    metrics=None,
+    pacer=None,
+):
+    """Scrape Maps listings for ``query`` in ``location``, yielding as it goes.
+
+    Yields ``(LEAD, lead)`` when a listing is captured and ``(ENRICH, lead)``
+    when deep search has filled in its email and social links; both carry
+    the same dict. Leads restored from ``resume_state`` are not yielded
+    again. The scrape runs in the caller's thread between ``next`` calls, so
+    a slow consumer pauses it instead of letting leads pile up, and closing
+    the generator stops it (pending enrichment is dropped). Nothing is kept
+    per lead beyond its dedup key unless ``checkpoint_callback`` needs the
+    full list.
+
+    When ``context`` is given (e.g. a pre-warmed context from ``browser_pool``)
+    it is reused as-is and left open; otherwise a browser is launched for this
+    call and closed afterwards. With ``max_parallel_tabs`` above 1, listing
+    pages are opened across that many tabs instead of clicking each card.
+    ``resource_policy`` is a ``resource_policy`` preset name ("lean",
+    "full") or a ``ResourcePolicy`` whose stats the caller reads afterwards.
+    ``lead_callback(lead)`` is called when a lead is captured and again when
+    enrichment updates it, just before the matching event is yielded.
+    ``enrich_cache`` is a ``DomainCacheSession`` consulted before fetching a
+    website during deep search. ``search_center`` is a ``(lat, lng, zoom)``
+    viewport: the search then opens ``/maps/search/<query>/@lat,lng,zoomz``
+    directly and lists what Maps finds around that point.
+    ``checkpoint_callback(state)`` periodically receives the collected
+    ``leads``, the ``seen`` keys and the feed ``index``; passing such a state
+    back as ``resume_state`` restores them and scrolls past the first
+    ``index`` listings without opening them. ``metrics`` (a
+    ``metrics.JobMetrics``) receives timing spans per phase and counters.
+    ``pacer`` (a ``pacing.PacingController``, ``DEFAULT_PACER`` if omitted)
+    spaces out navigations, feed scrolls and tab batches, and backs off on
+    consent walls, CAPTCHAs, empty feeds and timeouts; its host buckets
+    rate-limit deep-search fetches.
+    """
+    policy = resolve_policy(resource_policy)
+    metrics = metrics or NULL_METRICS
+    options = (
+        query, location, log_callback, max_results, stop_event, deep_search, max_parallel_tabs, lead_callback,
+        enrich_cache, search_center, resume_state, checkpoint_callback, metrics, pacer or DEFAULT_PACER,
+    )
+
+    def run(context):
+        policy.attach(context)
+        try:
+            yield from _iter_with_context(context, *options)
+        finally:
+            policy.detach(context)
+            if not policy.is_passthrough:
+                stats = policy.stats()
+                metrics.count("requests_blocked", stats["requests_blocked"])
+            if log_callback and not policy.is_passthrough:
+                log_callback(
+                    f"Resource policy '{policy.name}' skipped {stats['requests_blocked']} requests "
+                    f"(~{stats['bytes_skipped_estimate'] / 1_000_000:.1f} MB)."
+                )
+
+    if context is not None:
+        yield from run(context)
+        return
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=not show_browser,
-            args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
-        )
-        context = browser.new_context(locale="en-US")
-        page = context.new_page()
-        Stealth().apply_stealth_sync(page)
+        browser = launch_browser(p, show_browser)
+        try:
+            yield from run(new_stealth_context(browser))
+        finally:
+            browser.close()
 
-        log("Opening Google Maps...")
-        page.goto("https://www.google.com/maps", wait_until="domcontentloaded", timeout=60000)
 
-        for text in ["Accept all", "I agree", "Accept"]:
-            button = page.locator(f"button:has-text('{text}')")
-            if button.count() > 0:
-                button.first.click()
+async def aiter_scrape_google_maps(*args, executor=None, around=None, buffer_size=SCRAPE_BUFFER_SIZE, **kwargs):
+    """``iter_scrape_google_maps`` for asyncio code, as an async generator.
+
+    The scrape runs on ``executor`` (the browser slot's thread when reusing
+    its context, since Playwright's sync API is bound to one thread) and
+    hands events over through a queue of ``buffer_size``; when the consumer
+    falls that far behind, the scrape waits. ``around(func)``, if given,
+    wraps the call on that thread (profiling uses it). Events carry the
+    scrape's own lead dicts, so an enrichment may already show on a lead
+    whose LEAD event is still buffered. Exceptions from the scrape
+    are raised here once the events before them are consumed; closing this
+    generator early closes the scrape on its own thread and waits for it.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = asyncio.Queue(maxsize=buffer_size)
+    closed = threading.Event()
+
+    def send(item):
+        future = asyncio.run_coroutine_threadsafe(buffer.put(item), loop)
+        while not closed.is_set():
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def produce():
+        events = iter_scrape_google_maps(*args, **kwargs)
+        try:
+            for event in events:
+                if not send(event):
+                    break
+        finally:
+            events.close()
+            send(_SCRAPE_DONE)
+
+    producer = loop.run_in_executor(executor, functools.partial(around, produce) if around else produce)
+    try:
+        while True:
+            item = await buffer.get()
+            if item is _SCRAPE_DONE:
                 break
+            yield item
+        await producer
+    finally:
+        closed.set()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+def _first_rating_label(locator, limit):
+    for idx in range(min(locator.count(), limit)):
+        candidate = locator.nth(idx).get_attribute("aria-label")
+        if candidate and any(key in candidate.lower() for key in RATING_KEYS):
+            return candidate
+    return None
+
+
+def _card_text(card):
+    return card["text"] if isinstance(card, dict) else card.inner_text()
+
+
+def _extract_details(page, card, card_index=None):
+    """Read the open detail panel of ``page``.
+
+    ``card`` is either the feed article locator (click mode, with its
+    ``card_index`` in the feed) or the dict returned by ``COLLECT_CARDS_JS``
+    (multi-tab mode); it backs up the name and rating when the panel doesn't
+    show them.
+    """
+    try:
+        snapshot = page.evaluate(EXTRACT_DETAILS_JS, [card_index, RATING_SELECTOR, RATING_KEYS])
+    except Exception:
+        snapshot = None
+    if not snapshot:
+        return _extract_details_with_selectors(page, card)
+
+    if isinstance(card, dict):
+        card_text = card["text"]
+        card_rating_label = card["rating_label"]
+    else:
+        card_text = snapshot["card_text"]
+        card_rating_label = snapshot["card_rating_label"]
+        if card_text is None:
+            card_text = card.inner_text()
+
+    name = snapshot["name"]
+    if not name:
+        lines = card_text.splitlines()
+        name = lines[0].strip() if lines else None
+
+    rating, review_count = _parse_rating_and_reviews(card_rating_label or snapshot["panel_rating_label"])
+    if rating is None and review_count is None:
+        rating, review_count = _parse_rating_and_reviews(card_text)
+
+    return {
+        "name": name,
+        "phone": _clean_phone(snapshot["phone"]),
+        "website": snapshot["website"],
+        "rating": rating,
+        "review_count": review_count,
+    }
+
+
+def _extract_details_with_selectors(page, card):
+    """Selector-by-selector version of _extract_details (one IPC call per lookup)."""
+    if isinstance(card, dict):
+        card_rating_label = card["rating_label"]
+    else:
+        card_rating_label = _first_rating_label(card.locator(RATING_SELECTOR), 3)
+
+    name = _safe_text(page.locator("h1.DUwDvf"))
+    if not name:
+        name = _safe_text(page.locator("h1[aria-level='1']"))
+    if not name:
+        lines = _card_text(card).splitlines()
+        name = lines[0].strip() if lines else None
+
+    rating_label = card_rating_label
+    if not rating_label:
+        details_root = page.locator("div[role='main']")
+        rating_label = _first_rating_label(details_root.locator(RATING_SELECTOR), 5)
+    rating, review_count = _parse_rating_and_reviews(rating_label)
+    if rating is None and review_count is None:
+        rating, review_count = _parse_rating_and_reviews(_card_text(card))
+
+    phone = _safe_text(page.locator("button[data-item-id^='phone:']"))
+    if not phone:
+        phone = _safe_text(page.locator("button[data-item-id*='phone']"))
+    phone = _clean_phone(phone)
+
+    website = None
+    website_link = page.locator("a[data-item-id='authority']")
+    if website_link.count() > 0:
+        website = website_link.first.get_attribute("href")
+    else:
+        website_button = page.locator("button[data-item-id='authority']")
+        if website_button.count() > 0:
+            website = website_button.first.get_attribute("data-url")
+
+    return {
+        "name": name,
+        "phone": phone,
+        "website": website,
+        "rating": rating,
+        "review_count": review_count,
+    }
+
+
+def _enrich_with_browser(context, website, stop_event):
+    """Return ``(email, social_links)``, or ``None`` if stopped mid-fetch."""
+    social_links = []
+    email = None
+    try:
+        detail_page = context.new_page()
+        detail_page.goto(website, wait_until="domcontentloaded", timeout=30000)
+        _wait_until(
+            lambda timeout: detail_page.wait_for_load_state("networkidle", timeout=timeout) or True,
+            ENRICH_IDLE_WAIT_MS,
+            stop_event,
+        )
+        if stop_event and stop_event.is_set():
+            detail_page.close()
+            return None
+
+        page_text = detail_page.content()
+        social_links.extend(SOCIAL_PATTERN.findall(page_text))
+
+        email_match = EMAIL_PATTERN.search(page_text)
+        if email_match:
+            email = email_match.group(0)
 
-        search_box = None
-        for selector in ["input#searchboxinput", "input[aria-label*='Search']", "input[placeholder*='Search']"]:
-            candidate = page.locator(selector)
+        detail_page.close()
+    except Exception:
+        email = None
+
+    return email, list(dict.fromkeys(social_links))
+
+
+def _extract_in_tabs(tabs, cards, stop_event, log):
+    """Load one place page per tab, then read them back in feed order.
+
+    Navigations only wait for ``commit`` so every tab loads concurrently;
+    the slow part (rendering the detail panel) overlaps across tabs.
+    """
+    loaded = []
+    for tab, card in zip(tabs, cards):
+        if not card["href"]:
+            loaded.append(None)
+            continue
+        try:
+            tab.goto(card["href"], wait_until="commit", timeout=30000)
+            loaded.append(tab)
+        except Exception as e:
+            log(f"Lead extraction failed: {str(e)}")
+            loaded.append(None)
+
+    results = []
+    for tab, card in zip(loaded, cards):
+        if stop_event and stop_event.is_set():
+            break
+        if tab is None:
+            results.append(None)
+            continue
+        heading = tab.locator("h1.DUwDvf, h1[aria-level='1']").first
+        if _wait_until(lambda timeout: heading.wait_for(timeout=timeout) or True, 15000, stop_event) is None:
+            if not (stop_event and stop_event.is_set()):
+                log("Lead extraction failed: detail panel did not load")
+                results.append(None)
+            continue
+        try:
+            results.append(_extract_details(tab, card))
+        except Exception as e:
+            log(f"Lead extraction failed: {str(e)}")
+            results.append(None)
+    return results
+
+
+def _find_search_box(page):
+    for selector in ["input#searchboxinput", "input[aria-label*='Search']", "input[placeholder*='Search']"]:
+        candidate = page.locator(selector)
+        try:
+            candidate.wait_for(state="visible", timeout=15000)
+            return candidate
+        except Exception:
+            continue
+    return None
+
+
+def _search_url(query, location=None, center=None):
+    text = f"{query} in {location}" if location else query
+    url = f"{MAPS_URL}/search/{quote_plus(text)}"
+    if center:
+        lat, lng, zoom = center
+        url += f"/@{lat:.6f},{lng:.6f},{zoom:g}z"
+    return url
+
+
+def _iter_with_context(
+    context, query, location, log_callback, max_results, stop_event, deep_search, max_parallel_tabs, lead_callback,
+    enrich_cache, search_center, resume_state, checkpoint_callback, metrics, pacer,
+):
+    resume_state = resume_state or {}
+    # Only checkpoints need every lead; without them just the dedup keys stay.
+    leads = list(resume_state.get("leads", [])) if checkpoint_callback else None
+    seen = set(resume_state.get("seen", []))
+    last_checkpoint = 0.0
+
+    def log(message):
+        if log_callback:
+            log_callback(message)
+
+    # deep_search fetches run on the enricher's HTTP client concurrently with
+    # the Maps loop. Results come back through `enriched` and are applied
+    # here, on the Playwright thread, so pages that need JavaScript can be
+    # rendered and every event is yielded from the consumer's side.
+    enriched = queue.Queue()
+    # Events waiting to be yielded; drained after every listing.
+    pending = collections.deque()
+    # Websites rendered in the browser this run, so leads that shared one
+    # HTTP fetch don't each open a page.
+    rendered = {}
+
+    def apply_enrichment(lead, email, social_links):
+        lead["Email"] = email
+        lead["Social Links"] = social_links if social_links else None
+        if lead_callback:
+            lead_callback(lead)
+        pending.append((ENRICH, lead))
+
+    def on_enriched(lead, submitted, result):
+        metrics.observe("enrich", time.perf_counter() - submitted)
+        metrics.count("bytes_downloaded", result["bytes"])
+        enriched.put((lead, result))
+
+    def flush():
+        """Apply finished enrichment and yield pending events. Returns False if stopped."""
+        ok = True
+        while True:
             try:
-                candidate.wait_for(state="visible", timeout=15000)
-                search_box = candidate
+                lead, result = enriched.get_nowait()
+            except queue.Empty:
                 break
-            except Exception:
+            if not result["needs_browser"]:
+                apply_enrichment(lead, result["email"], result["social_links"])
+                continue
+            if not ok or (stop_event and stop_event.is_set()):
+                ok = False
                 continue
+            website = lead["Website"]
+            found = rendered.get(website)
+            if found is None:
+                with metrics.span("browser_fallback"):
+                    found = _enrich_with_browser(context, website, stop_event)
+                if found is None:
+                    ok = False
+                    continue
+                rendered[website] = found
+                if enrich_cache:
+                    enrich_cache.put(website, {"email": found[0], "social_links": found[1], "status": "browser"})
+            apply_enrichment(lead, *found)
+        while pending:
+            yield pending.popleft()
+        return ok and not (stop_event and stop_event.is_set())
+
+    def checkpoint(index, force=False):
+        nonlocal last_checkpoint
+        if not checkpoint_callback:
+            return
+        now = time.monotonic()
+        if not force and now - last_checkpoint < CHECKPOINT_INTERVAL_SECONDS:
+            return
+        last_checkpoint = now
+        checkpoint_callback({"leads": [dict(lead) for lead in leads], "seen": list(seen), "index": index})
+
+    def record(details):
+        """Dedup and yield one lead, queueing it for enrichment. Returns False if stopped."""
+        if not (yield from flush()):
+            return False
+        name = details["name"]
+        website = details["website"]
+        if not website:
+            log("Website not found")
+        if not name:
+            return True
+
+        lead_key = f"{name}|{details['phone']}|{website}"
+        if lead_key in seen:
+            metrics.count("duplicates")
+            return True
+
+        lead = {
+            "Name": name,
+            "Phone": details["phone"],
+            "Website": website,
+            "Rating": details["rating"],
+            "Review Count": details["review_count"],
+            "Social Links": None,
+            "Email": None,
+        }
+        if leads is not None:
+            leads.append(lead)
+        seen.add(lead_key)
+        metrics.count("leads")
+        if lead_callback:
+            lead_callback(lead)
+        log(f"Captured: {name}")
+        pending.append((LEAD, lead))
+        if enricher and website:
+            submitted = time.perf_counter()
+            enricher.submit(website, lambda result: on_enriched(lead, submitted, result))
+        elif enricher:
+            apply_enrichment(lead, None, [])
+        yield from flush()
+        return True
 
-        if not search_box:
+    page = context.pages[0] if context.pages else context.new_page()
+    if page.url.startswith(MAPS_URL):
+        log("Using warm Google Maps session...")
+    else:
+        log("Opening Google Maps...")
+        with metrics.span("open_maps"):
+            consent = open_maps_home(page)
+        if consent:
+            _back_off(pacer, "consent", log, metrics)
+
+    with metrics.span("pace_wait"):
+        pacer.wait(stop_event)
+    with metrics.span("search"):
+        search_box = None if search_center else _find_search_box(page)
+
+        if search_center:
+            log(f"Searching around {search_center[0]:.4f},{search_center[1]:.4f}...")
+            page.goto(_search_url(query, center=search_center), wait_until="domcontentloaded", timeout=60000)
+        elif not search_box:
             log("Search box not found. Falling back to direct search URL...")
-            search_query = f"{query} in {location}".replace(" ", "+")
-            page.goto(
-                f"https://www.google.com/maps/search/{search_query}",
-                wait_until="domcontentloaded",
-                timeout=60000,
-            )
+            page.goto(_search_url(query, location), wait_until="domcontentloaded", timeout=60000)
         else:
             search_box.fill(f"{query} in {location}")
             page.keyboard.press("Enter")
 
-        feed = page.locator("div[role='feed']")
-        try:
+    feed = page.locator("div[role='feed']")
+    try:
+        feed_started = time.perf_counter()
+        with metrics.span("feed_wait"):
             feed.wait_for(state="visible", timeout=15000)
-        except Exception:
-            log("No results feed found.")
-            browser.close()
-            return leads
+        pacer.success(time.perf_counter() - feed_started)
+    except Exception:
+        _back_off(pacer, "captcha" if _captcha_shown(page) else "empty_feed", log, metrics)
+        log("No results feed found.")
+        return
+
+    enricher = Enricher(cache=enrich_cache, host_buckets=pacer.hosts) if deep_search else None
+    tabs = [context.new_page() for _ in range(max_parallel_tabs)] if max_parallel_tabs > 1 else []
+    finished = False
+    try:
+        yield from _scroll_feed(
+            page, feed, tabs, record, log, max_results, stop_event, int(resume_state.get("index", 0)), checkpoint,
+            metrics, pacer,
+        )
+        finished = True
+    finally:
+        for tab in tabs:
+            try:
+                tab.close()
+            except Exception:
+                pass
+        if enricher:
+            # A consumer that closed the generator early wants no more events.
+            enricher.close(wait_for_pending=finished and not (stop_event and stop_event.is_set()))
+
+    if enricher:
+        yield from flush()
+    if enricher and enrich_cache:
+        stats = enrich_cache.stats()
+        log(f"Enrichment cache: {stats['hits']} hits, {stats['misses']} fetches.")
 
-        current_index = 0
-        last_count = 0
-        stagnant_rounds = 0
 
+def _scroll_feed(
+    page, feed, tabs, record, log, max_results, stop_event, start_index=0, checkpoint=None, metrics=NULL_METRICS,
+    pacer=DEFAULT_PACER,
+):
+    current_index = start_index
+    if start_index:
+        log(f"Fast-forwarding past {start_index} processed listings...")
+    stagnant_rounds = 0
+    feed_ended = False
+    last_name = None
+
+    try:
         while True:
             if stop_event and stop_event.is_set():
                 log("Scrape stopped by user.")
                 break
             items = feed.locator("div[role='article']")
             count = items.count()
-
-            while current_index < min(count, max_results):
-                if stop_event and stop_event.is_set():
-                    log("Scrape stopped by user.")
-                    break
-
-                item = items.nth(current_index)
-                try:
-                    item.scroll_into_view_if_needed()
-                    item.click()
-                    if not _wait_with_stop(page, 500, stop_event):
+            limit = min(count, max_results)
+
+            if tabs:
+                if current_index < limit:
+                    cards = page.evaluate(COLLECT_CARDS_JS, [current_index, limit, RATING_SELECTOR, RATING_KEYS])
+                    for start in range(0, len(cards), len(tabs)):
+                        if stop_event and stop_event.is_set():
+                            log("Scrape stopped by user.")
+                            break
+                        batch = cards[start:start + len(tabs)]
+                        with metrics.span("pace_wait"):
+                            pacer.wait(stop_event)
+                        batch_started = time.perf_counter()
+                        with metrics.span("tab_batch"):
+                            results = _extract_in_tabs(tabs, batch, stop_event, log)
+                        if any(details is None for details in results):
+                            _back_off(pacer, "captcha" if _captcha_shown(tabs[0]) else "timeout", log, metrics)
+                        else:
+                            pacer.success((time.perf_counter() - batch_started) / max(1, len(batch)))
+                        # Only listings actually handled count as done, so a resume
+                        # after a stop picks up the rest of this batch.
+                        processed, stopped = 0, False
+                        for details in results:
+                            if details is None:
+                                metrics.count("extraction_failures")
+                            elif not (yield from record(details)):
+                                stopped = True
+                                break
+                            processed += 1
+                        current_index += processed
+                        if checkpoint:
+                            checkpoint(current_index)
+                        if stopped:
+                            break
+            else:
+                while current_index < limit:
+                    if stop_event and stop_event.is_set():
+                        log("Scrape stopped by user.")
                         break
 
-                    name = _safe_text(page.locator("h1.DUwDvf"))
-                    if not name:
-                        name = _safe_text(page.locator("h1[aria-level='1']"))
-                    if not name:
-                        card_text = item.inner_text().splitlines()
-                        name = card_text[0].strip() if card_text else None
-
-                    rating_label = None
-                    card_rating = item.locator(
-                        "[aria-label*='stars'], [aria-label*='reviews'], "
-                        "[aria-label*='étoile'], [aria-label*='etoile'], [aria-label*='avis']"
-                    )
-                    for idx in range(min(card_rating.count(), 3)):
-                        candidate = card_rating.nth(idx).get_attribute("aria-label")
-                        if candidate and any(
-                            key in candidate.lower()
-                            for key in ["star", "review", "étoile", "etoile", "avis"]
-                        ):
-                            rating_label = candidate
+                    item = items.nth(current_index)
+                    try:
+                        click_started = time.perf_counter()
+                        with metrics.span("click"):
+                            item.scroll_into_view_if_needed()
+                            item.click()
+                            changed = _wait_for_js(page, DETAIL_CHANGED_JS, last_name, DETAIL_WAIT_MS, stop_event)
+                        if stop_event and stop_event.is_set():
                             break
+                        if changed is not None:
+                            pacer.success(time.perf_counter() - click_started)
+                        elif _captcha_shown(page):
+                            _back_off(pacer, "captcha", log, metrics)
+                        elif not last_name or _panel_name(page) != last_name:
+                            # A panel still showing the previous name is most likely the
+                            # next listing of a chain, not throttling.
+                            _back_off(pacer, "timeout", log, metrics)
+                        with metrics.span("extract"):
+                            details = _extract_details(page, item, current_index)
+                        last_name = details["name"]
+                        if not (yield from record(details)):
+                            break
+                    except Exception as e:
+                        metrics.count("extraction_failures")
+                        log(f"Lead extraction failed: {str(e)}")
 
-                    if not rating_label:
-                        details_root = page.locator("div[role='main']")
-                        rating_locator = details_root.locator(
-                            "[aria-label*='stars'], [aria-label*='reviews'], "
-                            "[aria-label*='étoile'], [aria-label*='etoile'], [aria-label*='avis']"
-                        )
-                        for idx in range(min(rating_locator.count(), 5)):
-                            candidate = rating_locator.nth(idx).get_attribute("aria-label")
-                            if candidate and any(
-                                key in candidate.lower()
-                                for key in ["star", "review", "étoile", "etoile", "avis"]
-                            ):
-                                rating_label = candidate
-                                break
-                    rating, review_count = _parse_rating_and_reviews(rating_label)
-                    if rating is None and review_count is None:
-                        card_text = item.inner_text()
-                        rating, review_count = _parse_rating_and_reviews(card_text)
-
-                    phone = _safe_text(page.locator("button[data-item-id^='phone:']"))
-                    if not phone:
-                        phone = _safe_text(page.locator("button[data-item-id*='phone']"))
-                    phone = _clean_phone(phone)
-
-                    website = None
-                    website_link = page.locator("a[data-item-id='authority']")
-                    if website_link.count() > 0:
-                        website = website_link.first.get_attribute("href")
-                    else:
-                        website_button = page.locator("button[data-item-id='authority']")
-                        if website_button.count() > 0:
-                            website = website_button.first.get_attribute("data-url")
-
-                    if not website:
-                        log("Website not found")
-
-                    if name:
-                        lead_key = f"{name}|{phone}|{website}"
-                        if lead_key not in seen:
-                            social_links = []
-                            email = None
-                            if deep_search and website:
-                                if stop_event and stop_event.is_set():
-                                    break
-                                try:
-                                    detail_page = context.new_page()
-                                    detail_page.goto(website, wait_until="domcontentloaded", timeout=30000)
-                                    if not _wait_with_stop(detail_page, int(random.uniform(1000, 2000)), stop_event):
-                                        detail_page.close()
-                                        break
-
-                                    page_text = detail_page.content()
-                                    social_matches = re.findall(
-                                        r"https?://(?:www\.)?(?:instagram\.com|facebook\.com|linkedin\.com)/[^\"\'\s>]+",
-                                        page_text,
-                                        re.IGNORECASE,
-                                    )
-                                    social_links.extend(social_matches)
-
-                                    email_match = re.search(
-                                        r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
-                                        page_text,
-                                    )
-                                    if email_match:
-                                        email = email_match.group(0)
-
-                                    detail_page.close()
-                                except Exception:
-                                    email = None
-
-                                social_links = list(dict.fromkeys(social_links))
-
-                            lead = {
-                                "Name": name,
-                                "Phone": phone,
-                                "Website": website,
-                                "Rating": rating,
-                                "Review Count": review_count,
-                                "Social Links": social_links if social_links else None,
-                                "Email": email,
-                            }
-                            leads.append(lead)
-                            seen.add(lead_key)
-                            log(f"Captured: {name}")
-                            log(f"__LEAD__:{json.dumps(lead, ensure_ascii=False)}")
-                            if deep_search:
-                                log(
-                                    "__ENRICH__:" + json.dumps(
-                                        {
-                                            "Name": name,
-                                            "Email": email,
-                                            "Social Links": social_links,
-                                        },
-                                        ensure_ascii=False,
-                                    )
-                                )
-
-                except Exception as e:
-                    log(f"Lead extraction failed: {str(e)}")
-
-                current_index += 1
+                    current_index += 1
+                    if checkpoint:
+                        checkpoint(current_index)
 
             if stop_event and stop_event.is_set():
                 break
 
-            if current_index >= max_results:
+            if current_index >= max_results or feed_ended:
                 break
 
-            if count == last_count:
+            with metrics.span("pace_wait"):
+                pacer.wait(stop_event)
+            if stop_event and stop_event.is_set():
+                continue
+            scroll_started = time.perf_counter()
+            with metrics.span("feed_scroll"):
+                if count > 0:
+                    items.nth(count - 1).scroll_into_view_if_needed()
+                feed.evaluate("el => { el.scrollTop = el.scrollHeight; }")
+                feed_state = _wait_for_js(page, FEED_GROWTH_JS, count, FEED_WAIT_MS, stop_event)
+            if feed_state is None:
+                # No new cards within FEED_WAIT_MS; give Maps one more scroll.
+                metrics.count("stagnant_rounds")
                 stagnant_rounds += 1
+                if stagnant_rounds >= 2:
+                    break
+                if not (stop_event and stop_event.is_set()):
+                    _back_off(pacer, "captcha" if _captcha_shown(page) else "timeout", log, metrics)
             else:
                 stagnant_rounds = 0
-                last_count = count
-
-            if stagnant_rounds >= 3:
-                break
-
-            if count > 0:
-                items.nth(count - 1).scroll_into_view_if_needed()
-            feed.evaluate("el => { el.scrollTop = el.scrollHeight; }")
-            _wait_with_stop(page, int(random.uniform(1000, 3000)), stop_event)
+                feed_ended = feed_state == "end"
+                pacer.success(time.perf_counter() - scroll_started)
             page_number = max(1, (current_index // 20) + 1)
-            log(f"__PROGRESS__:Scanning page {page_number}...")
-
-        browser.close()
-
-    return leads
+            log(f"__PROGRESS__:Scanning page {page_number}... (pace {pacer.delay:.1f}s)")
+    finally:
+        if checkpoint:
+            checkpoint(current_index, force=True)
@@ -0,0 +1,225 @@
+import json
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lead_store import lead_keys
+from protocol import enrich_message
+
+MAX_SHARDS = 64
+MAX_GRID_SIDE = 8
+DEFAULT_GRID_ZOOM = 14
+POLL_SECONDS = 0.25
+
+
+@dataclass
+class Shard:
+    index: int
+    label: str
+    location: str
+    center: Optional[Tuple[float, float, float]] = None
+
+
+def _grid_centers(grid: Dict[str, Any]) -> List[Tuple[float, float, float]]:
+    north, south = float(grid["north"]), float(grid["south"])
+    east, west = float(grid["east"]), float(grid["west"])
+    if north <= south or east <= west:
+        raise ValueError("Grid needs north > south and east > west.")
+    rows = max(1, min(int(grid.get("rows", 2)), MAX_GRID_SIDE))
+    cols = max(1, min(int(grid.get("cols", 2)), MAX_GRID_SIDE))
+    zoom = float(grid.get("zoom", DEFAULT_GRID_ZOOM))
+    lat_step = (north - south) / rows
+    lng_step = (east - west) / cols
+    return [
+        (south + (row + 0.5) * lat_step, west + (col + 0.5) * lng_step, zoom)
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+
+def plan_shards(
+    location: str,
+    areas: Optional[List[str]] = None,
+    grid: Optional[Dict[str, Any]] = None,
+) -> List[Shard]:
+    """Split ``location`` into named sub-areas or a lat/lng grid of viewports.
+
+    Raises ``ValueError`` for a malformed grid or when neither is given.
+    """
+    if grid:
+        try:
+            centers = _grid_centers(grid)
+        except (KeyError, TypeError) as exc:
+            raise ValueError("Grid needs numeric north, south, east and west.") from exc
+        return [
+            Shard(index, f"{lat:.4f},{lng:.4f}", location, (lat, lng, zoom))
+            for index, (lat, lng, zoom) in enumerate(centers)
+        ]
+    names = list(dict.fromkeys(area.strip() for area in areas or [] if area and area.strip()))
+    if not names:
+        raise ValueError("Sharding needs a list of areas or a grid.")
+    return [Shard(index, name, f"{name}, {location}") for index, name in enumerate(names[:MAX_SHARDS])]
+
+
+# Lines the parent rebuilds itself from the merged, deduplicated leads.
+_CHILD_SUPPRESSED = ("__LEAD__:", "__ENRICH__:", "__PROGRESS__:", "Captured: ")
+
+
+def _run_shard(
+    shard: Shard,
+    keyword: str,
+    deep_search: bool,
+    max_results: int,
+    resource_policy: Optional[str],
+    messages,
+    stop_event,
+) -> None:
+    """Scrape one shard in a worker process with its own browser."""
+    from scraper import scrape_google_maps
+
+    if stop_event.is_set():
+        messages.put(("done", shard.index, 0, None))
+        return
+    captured = set()
+
+    def log_callback(message: str) -> None:
+        if not message.startswith(_CHILD_SUPPRESSED):
+            messages.put(("log", shard.index, message, None))
+
+    def lead_callback(lead: Dict[str, Any]) -> None:
+        first = id(lead) not in captured
+        captured.add(id(lead))
+        messages.put(("lead", shard.index, dict(lead), first))
+
+    messages.put(("start", shard.index, None, None))
+    try:
+        leads = scrape_google_maps(
+            keyword,
+            shard.location,
+            log_callback,
+            max_results,
+            False,
+            stop_event,
+            deep_search,
+            resource_policy=resource_policy,
+            lead_callback=lead_callback,
+            search_center=shard.center,
+        )
+        messages.put(("done", shard.index, len(leads), None))
+    except Exception as exc:
+        messages.put(("done", shard.index, 0, str(exc)))
+
+
+def run_sharded(
+    keyword: str,
+    shards: List[Shard],
+    log_callback: Callable[[str], None],
+    max_results: int,
+    stop_event,
+    deep_search: bool = False,
+    resource_policy: Optional[str] = None,
+    workers: int = 2,
+    lead_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Run ``shards`` across a process pool and merge their leads.
+
+    Blocking; call it from a worker thread. Leads are deduplicated by
+    ``lead_store.lead_keys`` and the merged stream is emitted through ``log_callback``
+    in the same format as a single scrape. Once ``max_results`` unique leads
+    are in (or ``stop_event`` is set) every shard is told to stop.
+    """
+    context = multiprocessing.get_context("spawn")
+    total = len(shards)
+    labels = {shard.index: shard.label for shard in shards}
+    leads: List[Dict[str, Any]] = []
+    # Every key of a merged lead points at it; owners maps id(lead) to the
+    # shard that captured it first.
+    merged: Dict[str, Dict[str, Any]] = {}
+    owners: Dict[int, int] = {}
+    finished = set()
+    duplicates = 0
+
+    def progress() -> None:
+        log_callback(f"__PROGRESS__:Shards {len(finished)}/{total} done, {len(leads)} leads")
+
+    def on_lead(index: int, lead: Dict[str, Any], first: bool) -> None:
+        nonlocal duplicates
+        keys = lead_keys(lead)
+        current = next((merged[key] for key in keys if key in merged), None)
+        if current is None:
+            if not first or len(leads) >= max_results:
+                return
+            current = dict(lead)
+            for key in keys:
+                merged[key] = current
+            owners[id(current)] = index
+            leads.append(current)
+            if lead_callback:
+                lead_callback(current)
+            log_callback(f"Captured: {current['Name']}")
+            log_callback(f"__LEAD__:{json.dumps(current, ensure_ascii=False)}")
+            progress()
+            return
+        for key in keys:
+            merged.setdefault(key, current)
+        if first:
+            duplicates += 1
+            return
+        if owners[id(current)] != index and current.get("Email"):
+            return
+        current["Email"] = lead.get("Email") or current.get("Email")
+        current["Social Links"] = lead.get("Social Links") or current.get("Social Links")
+        if lead_callback:
+            lead_callback(current)
+        log_callback(enrich_message(current))
+
+    def on_done(index: int, count: int, error: Optional[str]) -> None:
+        if index in finished:
+            return
+        finished.add(index)
+        if error:
+            log_callback(f"Shard {index + 1}/{total} ({labels[index]}) failed: {error}")
+        else:
+            log_callback(f"Shard {index + 1}/{total} ({labels[index]}) finished with {count} listings.")
+        progress()
+
+    log_callback(f"Splitting search into {total} shards across {min(workers, total)} processes...")
+    with context.Manager() as manager:
+        messages = manager.Queue()
+        shard_stop = manager.Event()
+        pool = ProcessPoolExecutor(max_workers=max(1, min(workers, total)), mp_context=context)
+        try:
+            futures = {
+                pool.submit(
+                    _run_shard, shard, keyword, deep_search, max_results, resource_policy, messages, shard_stop
+                ): shard.index
+                for shard in shards
+            }
+            while len(finished) < total:
+                if not shard_stop.is_set() and (stop_event.is_set() or len(leads) >= max_results):
+                    shard_stop.set()
+                try:
+                    kind, index, payload, extra = messages.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    # Workers report "done" before returning, so a finished
+                    # future with nothing left in the queue means it crashed.
+                    for future, index in futures.items():
+                        if future.done() and index not in finished and future.exception() is not None:
+                            on_done(index, 0, str(future.exception()))
+                    continue
+                if kind == "lead":
+                    on_lead(index, payload, extra)
+                elif kind == "log":
+                    log_callback(f"[{labels[index]}] {payload}")
+                elif kind == "start":
+                    log_callback(f"Shard {index + 1}/{total} started: {labels[index]}")
+                elif kind == "done":
+                    on_done(index, payload, extra)
+        finally:
+            shard_stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    log_callback(f"Merged {len(leads)} unique leads from {total} shards ({duplicates} duplicates dropped).")
+    return leads
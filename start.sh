@@ -1,4 +1,5 @@
 #!/usr/bin/env bash
 set -e
 
-exec uvicorn app:app --host 0.0.0.0 --port ${PORT:-8000}
+# permessage-deflate is negotiated per connection; clients that don't offer it get plain frames.
+exec uvicorn app:app --host 0.0.0.0 --port ${PORT:-8000} --ws-per-message-deflate ${WS_PER_MESSAGE_DEFLATE:-true}
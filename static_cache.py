@@ -0,0 +1,55 @@
+import gzip
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+GZIP_LEVEL = 6
+
+
+class CachedFile:
+    """A small static file served from memory.
+
+    The file is read and gzipped once, then again only when its mtime
+    changes. ``response`` answers conditional GETs with 304 and sends the
+    gzipped body to clients that accept it; each encoding gets its own ETag.
+    """
+
+    def __init__(self, path: str, media_type: str, cache_control: str = "no-cache") -> None:
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._body = b""
+        self._gzipped = b""
+        self._etag = ""
+
+    def _current(self) -> Tuple[bytes, bytes, str]:
+        mtime = os.stat(self.path).st_mtime
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, "rb") as handle:
+                    body = handle.read()
+                self._body = body
+                self._gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+                self._etag = hashlib.sha256(body).hexdigest()[:32]
+                self._mtime = mtime
+                self.loads += 1
+            return self._body, self._gzipped, self._etag
+
+    def response(self, request: Request) -> Response:
+        body, gzipped, etag = self._current()
+        use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+        tag = f'"{etag}-gz"' if use_gzip else f'"{etag}"'
+        headers = {"ETag": tag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        candidates = {value.strip().removeprefix("W/") for value in request.headers.get("if-none-match", "").split(",")}
+        if tag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(gzipped, media_type=self.media_type, headers=headers)
+        return Response(body, media_type=self.media_type, headers=headers)
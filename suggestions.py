@@ -0,0 +1,302 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Word prefixes longer than this are looked up by their first
+# MAX_PREFIX_LENGTH characters and then checked against the full word.
+MAX_PREFIX_LENGTH = 12
+# Queries shorter than this only match by prefix; typo tolerance needs a
+# few characters to go on.
+MIN_FUZZY_LENGTH = 5
+# Labels sharing the most trigrams with the query that get an edit-distance check.
+FUZZY_CANDIDATES = 32
+CACHE_SIZE = 2048
+# A load touching more labels than this clears the whole cache instead of
+# checking every cached query against every label.
+MAX_INVALIDATE_LABELS = 16
+DEFAULT_LIMIT = 6
+MAX_LIMIT = 50
+RUN_WEIGHT = 1.0
+LEAD_WEIGHT = 0.5
+# Added when the whole label, not just a later word, starts with the query.
+START_BONUS = 1.0
+
+NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse punctuation/whitespace to single spaces."""
+    folded = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return NON_ALNUM.sub(" ", folded.lower()).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f" {text}"
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _typo_limit(length: int) -> int:
+    return 1 if length < 8 else 2
+
+
+def _prefix_distance(query: str, text: str, limit: int) -> Optional[int]:
+    """Edit distance (with transpositions) from ``query`` to the closest prefix
+    of ``text``, or None if it exceeds ``limit``.
+
+    Only cells within ``limit`` of the diagonal can stay under the limit, so
+    each row computes just that band.
+    """
+    text = text[:len(query) + limit]
+    width = len(text)
+    over = limit + 1
+    before: List[int] = []
+    previous = [column if column <= limit else over for column in range(width + 1)]
+    for row in range(1, len(query) + 1):
+        current = [over] * (width + 1)
+        row_best = over
+        if row <= limit:
+            current[0] = row_best = row
+        char = query[row - 1]
+        for column in range(max(1, row - limit), min(width, row + limit) + 1):
+            value = min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (char != text[column - 1]))
+            if row > 1 and column > 1 and char == text[column - 2] and query[row - 2] == text[column - 1]:
+                value = min(value, before[column - 2] + 1)
+            if value < row_best:
+                row_best = value
+            current[column] = value if value < over else over
+        if row_best > limit:
+            return None
+        before, previous = previous, current
+    best = min(previous)
+    return best if best <= limit else None
+
+
+class _Entry:
+    __slots__ = ("label", "norm", "words", "starts", "runs", "leads", "order", "popularity")
+
+    def __init__(self, label: str, norm: str, order: int) -> None:
+        self.label = label
+        self.norm = norm
+        self.words = norm.split()
+        self.starts = [index for index in range(len(norm)) if index == 0 or norm[index - 1] == " "]
+        self.runs = 0
+        self.leads = 0
+        self.order = order
+        self.popularity = 0.0
+
+    def count(self, runs: int, leads: int) -> None:
+        self.runs += max(0, int(runs or 0))
+        self.leads += max(0, int(leads or 0))
+        self.popularity = RUN_WEIGHT * math.log1p(self.runs) + LEAD_WEIGHT * math.log1p(self.leads)
+
+
+class SuggestionIndex:
+    """Ranked autocomplete over one set of labels (keywords or locations).
+
+    Every label is indexed by the prefixes of each of its words and by the
+    trigrams of its text, so a lookup touches only labels that can match.
+    Labels whose words start with the query words come first; when there
+    are not enough of those, labels within one or two typos of the query
+    fill the rest. Within each group, labels rank by how often they were
+    searched and how many leads those searches found, then by seed order.
+    Results are cached per query; ``add`` updates the index in place and
+    drops only the cached queries the added label could appear in.
+    """
+
+    def __init__(self, seeds: Iterable[str] = (), cache_size: int = CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._cache: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        for label in seeds:
+            self._entry(label)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, label: str) -> Optional[_Entry]:
+        label = " ".join(label.split())
+        norm = normalize(label)
+        if not norm:
+            return None
+        entry = self._entries.get(norm)
+        if entry is None:
+            entry = self._entries[norm] = _Entry(label, norm, len(self._entries))
+            for word in entry.words:
+                for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                    self._prefixes.setdefault(word[:length], set()).add(norm)
+            for gram in _trigrams(norm):
+                self._trigrams.setdefault(gram, set()).add(norm)
+        return entry
+
+    def add(self, label: str, runs: int = 1, leads: int = 0) -> None:
+        """Count ``runs`` searches for ``label`` that found ``leads`` leads, adding it if new."""
+        self.load([(label, runs, leads)])
+
+    def load(self, rows: Iterable[Tuple[str, int, int]]) -> None:
+        """``add`` for many ``(label, runs, leads)`` rows at once."""
+        with self._lock:
+            changed: Dict[str, _Entry] = {}
+            for label, runs, leads in rows:
+                entry = self._entry(label or "")
+                if entry is not None:
+                    entry.count(runs, leads)
+                    changed[entry.norm] = entry
+            if len(changed) > MAX_INVALIDATE_LABELS:
+                self._cache.clear()
+            elif changed and self._cache:
+                labels = [(entry, _trigrams(entry.norm)) for entry in changed.values()]
+                stale = [
+                    key for key in self._cache
+                    if any(self._may_list(key[0], entry, grams) for entry, grams in labels)
+                ]
+                for key in stale:
+                    del self._cache[key]
+
+    @staticmethod
+    def _may_list(norm: str, entry: _Entry, grams: Set[str]) -> bool:
+        """Whether ``entry`` (with trigrams ``grams``) can be ranked for ``norm``.
+
+        Mirrors ``_rank``: a label that is neither a prefix match nor a fuzzy
+        candidate for the query cannot change its results.
+        """
+        if not norm:
+            return True
+        words = norm.split()
+        if all(any(part.startswith(word) for part in entry.words) for word in words):
+            return True
+        if len(norm) < MIN_FUZZY_LENGTH:
+            return False
+        query_grams = _trigrams(norm)
+        return len(query_grams & grams) >= max(1, len(query_grams) - 3 * _typo_limit(len(norm)))
+
+    def suggest(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        norm = normalize(query)
+        limit = max(1, min(limit, MAX_LIMIT))
+        key = (norm, limit)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+            result = self._rank(norm, limit)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return list(result)
+
+    def _rank(self, norm: str, limit: int) -> List[str]:
+        if not norm:
+            entries = heapq.nsmallest(limit, self._entries.values(), key=lambda entry: (-entry.popularity, entry.order))
+            return [entry.label for entry in entries]
+
+        matched = self._prefix_matches(norm.split())
+        ranked = heapq.nsmallest(
+            limit,
+            (self._entries[name] for name in matched),
+            key=lambda entry: (
+                -(entry.popularity + (START_BONUS if entry.norm.startswith(norm) else 0.0)),
+                entry.order,
+            ),
+        )
+        labels = [entry.label for entry in ranked]
+        if len(labels) < limit and len(norm) >= MIN_FUZZY_LENGTH:
+            fuzzy = self._fuzzy_matches(norm, exclude=matched)
+            labels.extend(entry.label for entry in fuzzy[:limit - len(labels)])
+        return labels
+
+    def _prefix_matches(self, words: List[str]) -> Set[str]:
+        # Each query word must start some word of the label.
+        matched: Optional[Set[str]] = None
+        for word in sorted(words, key=len, reverse=True):
+            candidates = self._prefixes.get(word[:MAX_PREFIX_LENGTH], set())
+            if len(word) > MAX_PREFIX_LENGTH:
+                candidates = {
+                    name for name in candidates if any(part.startswith(word) for part in self._entries[name].words)
+                }
+            matched = candidates if matched is None else matched & candidates
+            if not matched:
+                return set()
+        return set(matched or ())
+
+    def _fuzzy_matches(self, norm: str, exclude: Set[str]) -> List[_Entry]:
+        limit = _typo_limit(len(norm))
+        grams = _trigrams(norm)
+        # Each edit breaks at most three of the query's trigrams.
+        needed = max(1, len(grams) - 3 * limit)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for name in self._trigrams.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+        candidates = [(count, name) for name, count in shared.items() if count >= needed and name not in exclude]
+        scored = []
+        for _, name in heapq.nlargest(FUZZY_CANDIDATES, candidates):
+            entry = self._entries[name]
+            # Compare against the label from each of its word starts, skipping
+            # those whose first letters share nothing with the query's.
+            head = norm[:limit + 1]
+            distances = [
+                _prefix_distance(norm, entry.norm[start:], limit)
+                for start in entry.starts
+                if entry.norm[start] in head or norm[0] in entry.norm[start:start + limit + 1]
+            ]
+            distances = [distance for distance in distances if distance is not None]
+            if distances:
+                scored.append((min(distances), -entry.popularity, entry.order, entry))
+        scored.sort(key=lambda item: item[:3])
+        return [item[3] for item in scored]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "searched": sum(1 for entry in self._entries.values() if entry.runs),
+                "cached_queries": len(self._cache),
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+            }
+
+
+class SuggestionEngine:
+    """Keyword and location suggestions ranked by the searches that ran.
+
+    Keywords start from a seed list and locations start empty; both grow
+    from the lead store's history (``load_history``) and from each job as
+    it finishes (``record_job``).
+    """
+
+    FIELDS = ("keyword", "location")
+
+    def __init__(self, keywords: Iterable[str] = ()) -> None:
+        self.keywords = SuggestionIndex(keywords)
+        self.locations = SuggestionIndex()
+
+    def index(self, field: str) -> SuggestionIndex:
+        return self.locations if field == "location" else self.keywords
+
+    def load_history(self, rows: Iterable[Tuple[str, str, int, int]]) -> None:
+        """Load ``(keyword, location, runs, leads)`` rows such as ``LeadStore.query_history`` returns."""
+        rows = list(rows)
+        self.keywords.load((keyword, runs, leads) for keyword, _, runs, leads in rows)
+        self.locations.load((location, runs, leads) for _, location, runs, leads in rows)
+
+    def record_job(self, keyword: str, location: str, leads: int) -> None:
+        self.keywords.add(keyword, 1, leads)
+        self.locations.add(location, 1, leads)
+
+    def suggest(self, field: str, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        return self.index(field).suggest(query, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {field: self.index(field).stats() for field in self.FIELDS}